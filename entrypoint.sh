@@ -9,11 +9,23 @@ MQTT_PID=$!
 python3 -m http.server 8080 > /dev/null 2>&1 &
 HTTP_PID=$!
 
+# Start the round-trip health probe when broker credentials are provided
+PROBE_PID=""
+if [ -n "$MQTT_USERNAME" ] && [ -n "$MQTT_PASSWORD" ]; then
+  python3 /usr/local/lib/mqtt-health/mqtt_health_probe.py --sidecar \
+    --port "${MQTT_PORT:-1883}" \
+    --interval "${MQTT_HEALTH_INTERVAL:-5}" \
+    --slo-ms "${MQTT_HEALTH_SLO_MS:-500}" \
+    --status-file /tmp/mqtt-health.json &
+  PROBE_PID=$!
+fi
+
 # Wait for MQTT process to exit
 wait $MQTT_PID
 EXIT_CODE=$?
 
-# Kill the HTTP server if MQTT exits
+# Kill the HTTP server and probe if MQTT exits
 kill $HTTP_PID 2>/dev/null || true
+[ -n "$PROBE_PID" ] && kill $PROBE_PID 2>/dev/null || true
 
 exit $EXIT_CODE
@@ -1,6 +1,14 @@
 #!/bin/sh
 # Health check script for MQTT broker
-# Checks if MQTT is listening on port 1883
+# Uses the round-trip probe sidecar status when it is running (see entrypoint.sh),
+# otherwise checks if MQTT is listening on port 1883
+
+STATUS_FILE=/tmp/mqtt-health.json
+
+if [ -f "$STATUS_FILE" ]; then
+  exec python3 /usr/local/lib/mqtt-health/mqtt_health_probe.py \
+    --check-file "$STATUS_FILE" --max-age "${MQTT_HEALTH_MAX_AGE:-30}" > /dev/null 2>&1
+fi
 
 # Try to connect to MQTT port
 if nc -zv 127.0.0.1 1883 > /dev/null 2>&1; then
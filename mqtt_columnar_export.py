@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+MQTT Columnar Export
+Buffers decoded sensor readings into typed column arrays and flushes
+fixed-size chunks to disk (.npy per column, or Parquet when pyarrow is
+installed) with a JSON manifest. Chunks are read back memory-mapped.
+
+Usage:
+    # Export live readings (via the subscriber)
+    python3 mqtt_subscriber.py --topic "sensors/#" --sink columnar:export --quiet
+
+    # Convert an existing JSON lines capture
+    python3 mqtt_columnar_export.py --dir export --import-jsonl readings.jsonl
+
+    # Summarise an export
+    python3 mqtt_columnar_export.py --dir export
+"""
+
+import os
+import sys
+import json
+import mmap
+import queue
+import struct
+import argparse
+import threading
+import time
+from array import array
+
+from mqtt_sqlite_sink import FIELDS, reading_to_row
+
+# Optional backends
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+MANIFEST = "manifest.json"
+
+# Column name -> array typecode. "sensor" holds codes into the manifest's sensor list.
+COLUMNS = {"ts": "d", "sensor": "i", "sequence": "q"}
+COLUMNS.update((field, "d") for field in FIELDS)
+
+NPY_DESCR = {"d": "<f8", "q": "<i8", "i": "<i4"}
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+def write_npy(path, values):
+    """
+    Write an array.array as a 1-D .npy file (no NumPy required)
+
+    Args:
+        path: Output file path
+        values: array.array with typecode 'd', 'q' or 'i'
+    """
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (
+        NPY_DESCR[values.typecode], len(values))
+    # Pad so the data starts on a 64 byte boundary
+    padding = 64 - (len(NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header = header + " " * (padding % 64) + "\n"
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    with open(path, "wb") as f:
+        f.write(NPY_MAGIC)
+        f.write(struct.pack("<H", len(header)))
+        f.write(header.encode("latin1"))
+        values.tofile(f)
+
+
+def mmap_npy(path, typecode):
+    """
+    Memory-map a .npy column written by write_npy()
+
+    Returns a numpy.memmap when NumPy is installed, otherwise a read-only
+    memoryview cast to the column's typecode.
+    """
+    if np is not None:
+        return np.load(path, mmap_mode="r")
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header_len = struct.unpack_from("<H", mm, len(NPY_MAGIC))[0]
+    offset = len(NPY_MAGIC) + 2 + header_len
+    return memoryview(mm)[offset:].cast(typecode)
+
+
+class ColumnarExporter:
+    """Chunked columnar writer fed from the MQTT network thread"""
+
+    def __init__(self, directory, chunk_size=65536, fmt="auto"):
+        """
+        Initialize columnar exporter
+
+        Args:
+            directory: Export directory (created if missing, appended to if it exists)
+            chunk_size: Rows per chunk
+            fmt: "npy", "parquet" or "auto" (Parquet when pyarrow is installed)
+        """
+        if fmt == "auto":
+            fmt = "parquet" if pa is not None else "npy"
+        if fmt == "parquet" and pa is None:
+            raise ValueError("Parquet export requires pyarrow")
+        if fmt not in ("npy", "parquet"):
+            raise ValueError(f"Unknown export format '{fmt}'")
+
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.format = fmt
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.manifest = {"version": 1, "format": fmt,
+                         "columns": {name: NPY_DESCR[code] for name, code in COLUMNS.items()},
+                         "sensors": [], "chunks": []}
+        self.sensor_codes = {}
+        self.columns = self._new_columns()
+        self.rows_written = 0
+        self.rows_rejected = 0
+
+    def _new_columns(self):
+        return {name: array(code) for name, code in COLUMNS.items()}
+
+    def start(self):
+        """Load any existing manifest and start the writer thread"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as f:
+                manifest = json.load(f)
+            if manifest["format"] != self.format:
+                raise ValueError(f"Existing export in {self.directory} uses format '{manifest['format']}'")
+            self.manifest = manifest
+            self.sensor_codes = {name: code for code, name in enumerate(manifest["sensors"])}
+        self.thread = threading.Thread(target=self._writer, name="columnar-export", daemon=True)
+        self.thread.start()
+        print(f"✓ Columnar export ({self.format}) writing to {self.directory}")
+
+    def write(self, topic, data):
+        """
+        Queue a decoded reading (called on the MQTT network thread)
+
+        Args:
+            topic: Topic the reading arrived on
+            data: Decoded JSON object
+        """
+        self.queue.put((topic, data, time.time()))
+
+    def append(self, topic, data, received_at):
+        """Append one reading to the column buffers (writer thread only)"""
+        row = reading_to_row(topic, data, received_at)
+        sensor_id = row[0]
+        code = self.sensor_codes.get(sensor_id)
+        if code is None:
+            code = self.sensor_codes[sensor_id] = len(self.manifest["sensors"])
+            self.manifest["sensors"].append(sensor_id)
+
+        columns = self.columns
+        rows = len(columns["ts"])
+        try:
+            columns["ts"].append(row[1])
+            columns["sensor"].append(code)
+            columns["sequence"].append(row[3] if isinstance(row[3], int) else -1)
+            for field, value in zip(FIELDS, row[4:]):
+                columns[field].append(value if value is not None else float("nan"))
+        except (OverflowError, TypeError) as e:
+            # Drop the partial row so the columns stay aligned
+            for values in columns.values():
+                del values[rows:]
+            raise ValueError(f"Cannot store reading from {topic}: {e}") from e
+
+        if len(columns["ts"]) >= self.chunk_size:
+            self.flush()
+
+    def _writer(self):
+        """Writer thread: append queued readings and flush full chunks"""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                self.append(*item)
+            except ValueError:
+                self.rows_rejected += 1
+        self.flush()
+
+    def flush(self):
+        """Write the buffered rows as a chunk and update the manifest"""
+        columns = self.columns
+        rows = len(columns["ts"])
+        if rows == 0:
+            return
+        self.columns = self._new_columns()
+
+        name = f"chunk_{len(self.manifest['chunks']):06d}"
+        try:
+            if self.format == "parquet":
+                self._write_parquet(name, columns)
+                name += ".parquet"
+            else:
+                chunk_dir = os.path.join(self.directory, name)
+                os.makedirs(chunk_dir, exist_ok=True)
+                for column, values in columns.items():
+                    write_npy(os.path.join(chunk_dir, f"{column}.npy"), values)
+        except OSError as e:
+            print(f"✗ Export write error: {e}")
+            return
+
+        ts = columns["ts"]
+        self.manifest["chunks"].append({"name": name, "rows": rows,
+                                        "ts_min": min(ts), "ts_max": max(ts)})
+        self.rows_written += rows
+        self._save_manifest()
+
+    def _write_parquet(self, name, columns):
+        arrays = {column: pa.array(values) for column, values in columns.items() if column != "sensor"}
+        arrays["sensor_id"] = pa.DictionaryArray.from_arrays(
+            pa.array(columns["sensor"], type=pa.int32()), pa.array(self.manifest["sensors"]))
+        pq.write_table(pa.table(arrays), os.path.join(self.directory, name + ".parquet"))
+
+    def _save_manifest(self):
+        path = os.path.join(self.directory, MANIFEST)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, path)
+
+    def close(self):
+        """Flush the final partial chunk and stop the writer thread"""
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+            print(f"Columnar export: {self.rows_written} rows in {len(self.manifest['chunks'])} chunks, "
+                  f"{self.rows_rejected} rejected")
+
+
+def load_manifest(directory):
+    """Read an export's manifest"""
+    with open(os.path.join(directory, MANIFEST)) as f:
+        return json.load(f)
+
+
+def open_chunks(directory):
+    """
+    Yield each chunk of an export as a dict of memory-mapped columns
+
+    npy exports yield numpy.memmap arrays (or memoryviews without NumPy);
+    Parquet exports yield memory-mapped pyarrow tables.
+    """
+    manifest = load_manifest(directory)
+    for chunk in manifest["chunks"]:
+        path = os.path.join(directory, chunk["name"])
+        if manifest["format"] == "parquet":
+            table = pq.read_table(path, memory_map=True)
+            yield {name: table.column(name) for name in table.column_names}
+        else:
+            yield {column: mmap_npy(os.path.join(path, f"{column}.npy"), code)
+                   for column, code in COLUMNS.items()}
+
+
+def import_jsonl(exporter, path):
+    """Feed a JSON lines file through an exporter (one reading per line)"""
+    count = 0
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            if isinstance(data, dict):
+                exporter.write(data.get("topic", ""), data)
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MQTT Columnar Export')
+    parser.add_argument('--dir', required=True, help='Export directory')
+    parser.add_argument('--import-jsonl', help='Convert a JSON lines file into chunks')
+    parser.add_argument('--format', choices=['auto', 'npy', 'parquet'], default='auto',
+                        help='Chunk format for --import-jsonl (default: auto)')
+    parser.add_argument('--chunk-size', type=int, default=65536, help='Rows per chunk (default: 65536)')
+
+    args = parser.parse_args()
+
+    if args.import_jsonl:
+        exporter = ColumnarExporter(args.dir, args.chunk_size, args.format)
+        exporter.start()
+        start = time.time()
+        count = import_jsonl(exporter, args.import_jsonl)
+        exporter.close()
+        print(f"Imported {count} readings in {time.time() - start:.2f}s")
+        return
+
+    manifest = load_manifest(args.dir)
+    total = sum(chunk["rows"] for chunk in manifest["chunks"])
+    print(f"Format: {manifest['format']}")
+    print(f"Chunks: {len(manifest['chunks'])}, rows: {total}, sensors: {len(manifest['sensors'])}")
+    if not total:
+        return
+
+    start = time.time()
+    sums = dict.fromkeys(FIELDS, 0.0)
+    counts = dict.fromkeys(FIELDS, 0)
+    for chunk in open_chunks(args.dir):
+        for field in FIELDS:
+            if np is not None:
+                values = np.asarray(chunk[field])
+                valid = values[~np.isnan(values)]
+                sums[field] += float(valid.sum())
+                counts[field] += len(valid)
+            else:
+                for value in chunk[field]:
+                    if value == value:
+                        sums[field] += value
+                        counts[field] += 1
+    for field in FIELDS:
+        if counts[field]:
+            print(f"  {field}: mean {sums[field] / counts[field]:.3f} over {counts[field]} values")
+    print(f"Scanned in {time.time() - start:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
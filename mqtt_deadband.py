@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+MQTT Deadband Filter
+Report-by-exception filtering for sensor publishers: a reading is only sent
+when a field moved beyond its deadband (absolute or percentage) since the last
+sent reading, or when the sensor has been silent for the heartbeat period.
+
+Usage:
+    python3 mqtt_sensor_simulator.py --sensors 100 --deadband temperature=0.5,humidity=2 --heartbeat 60
+    python3 mqtt_render_pubsub.py --mode sensor --host ... --port ... --deadband-pct 5
+
+    # Estimate suppression offline for the simulated readings
+    python3 mqtt_deadband.py --sensors 100 --rounds 1000 --deadband temperature=0.5 --deadband-pct 3
+"""
+
+import time
+import argparse
+from array import array
+
+# Numeric fields compared by default
+DEFAULT_FIELDS = ("temperature", "humidity", "pressure", "battery")
+
+
+def parse_deadbands(spec):
+    """
+    Parse "field=value,field=value" into a dictionary
+
+    Args:
+        spec: Deadband specification, e.g. "temperature=0.5,humidity=2"
+    """
+    deadbands = {}
+    if not spec:
+        return deadbands
+    for item in spec.split(","):
+        field, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid deadband '{item}' (expected field=value)")
+        deadbands[field.strip()] = float(value)
+    return deadbands
+
+
+class DeadbandFilter:
+    """Per-sensor report-by-exception state in flat array tables"""
+
+    def __init__(self, deadbands=None, percent=None, heartbeat=60.0, fields=DEFAULT_FIELDS):
+        """
+        Initialize deadband filter
+
+        Args:
+            deadbands: Dictionary of field -> absolute deadband
+            percent: Percentage-change deadband for fields without an absolute one
+            heartbeat: Maximum seconds between readings from one sensor
+            fields: Fields to compare (others are sent along but never trigger)
+        """
+        deadbands = deadbands or {}
+        self.fields = tuple(fields)
+        self.absolute = tuple(deadbands.get(field) for field in self.fields)
+        self.percent = percent / 100.0 if percent else None
+        self.heartbeat = heartbeat
+        self.slots = {}            # sensor id -> row in the tables
+        self.values = array('d')   # last sent value, len(fields) entries per sensor
+        self.sent_at = array('d')  # last send time per sensor
+        self.offered = 0
+        self.sent = 0
+        self.heartbeats = 0
+
+    def _store(self, base, reading):
+        values = self.values
+        for j, field in enumerate(self.fields):
+            value = reading.get(field)
+            if value is not None:
+                values[base + j] = value
+
+    def should_send(self, sensor_id, reading, now=None):
+        """
+        Decide whether a reading is worth publishing and record it if so
+
+        Args:
+            sensor_id: Sensor identifier
+            reading: Reading dictionary
+            now: Current time (defaults to time.monotonic())
+        """
+        if now is None:
+            now = time.monotonic()
+        self.offered += 1
+        width = len(self.fields)
+
+        slot = self.slots.get(sensor_id)
+        if slot is None:
+            slot = self.slots[sensor_id] = len(self.sent_at)
+            self.values.extend([0.0] * width)
+            self.sent_at.append(now)
+            self._store(slot * width, reading)
+            self.sent += 1
+            return True
+
+        base = slot * width
+        if now - self.sent_at[slot] >= self.heartbeat:
+            self.heartbeats += 1
+        else:
+            values = self.values
+            percent = self.percent
+            for j, field in enumerate(self.fields):
+                value = reading.get(field)
+                if value is None:
+                    continue
+                last = values[base + j]
+                limit = self.absolute[j]
+                if limit is None:
+                    if percent is None:
+                        continue
+                    limit = abs(last) * percent
+                if abs(value - last) > limit:
+                    break
+            else:
+                return False
+
+        self._store(base, reading)
+        self.sent_at[slot] = now
+        self.sent += 1
+        return True
+
+    @property
+    def suppression_ratio(self):
+        """Fraction of offered readings that were not sent"""
+        return 1 - self.sent / self.offered if self.offered else 0.0
+
+    def report(self):
+        """Return a one-line summary of traffic suppression"""
+        return (f"Deadband: {self.offered} readings offered, {self.sent} sent "
+                f"({self.heartbeats} heartbeats), suppression {self.suppression_ratio:.1%}")
+
+
+def create_filter(args):
+    """Build a DeadbandFilter from --deadband/--deadband-pct/--heartbeat, or None"""
+    if not args.deadband and not args.deadband_pct:
+        return None
+    return DeadbandFilter(parse_deadbands(args.deadband), args.deadband_pct, args.heartbeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Estimate deadband suppression on simulated readings')
+    parser.add_argument('--sensors', type=int, default=100, help='Number of sensors (default: 100)')
+    parser.add_argument('--rounds', type=int, default=1000, help='Readings per sensor (default: 1000)')
+    parser.add_argument('--interval', type=float, default=2.0, help='Simulated seconds per round (default: 2)')
+    parser.add_argument('--deadband', help='Absolute deadbands, e.g. temperature=0.5,humidity=2')
+    parser.add_argument('--deadband-pct', type=float,
+                        help='Percentage-change deadband for fields without an absolute one')
+    parser.add_argument('--heartbeat', type=float, default=60.0,
+                        help='Maximum seconds between readings per sensor (default: 60)')
+
+    args = parser.parse_args()
+
+    from mqtt_render_pubsub import generate_sensor_reading
+
+    deadband = create_filter(args)
+    if deadband is None:
+        parser.error("specify --deadband and/or --deadband-pct")
+
+    sequence = 0
+    for round_number in range(args.rounds):
+        now = round_number * args.interval
+        for i in range(1, args.sensors + 1):
+            sequence += 1
+            sensor_id = f"sensor_{i:03d}"
+            deadband.should_send(sensor_id, generate_sensor_reading(sensor_id, sequence), now)
+    print(deadband.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+MQTT Payload Decoder
+Learns the payload kind of every topic (sensor reading, other JSON, text or
+binary) and caches it, so steady traffic takes a single decode attempt instead
+of UTF-8 decode + json.loads + exception fallbacks per message. Sensor
+readings can optionally be decoded into compact __slots__ records (records=True)
+for consumers that keep many readings in memory. orjson or ujson is used
+when installed.
+
+Usage:
+    # Compare per-message decode time against the plain json.loads fallback chain
+    python3 mqtt_decoder.py --bench
+    python3 mqtt_decoder.py --bench --messages 200000
+    python3 mqtt_decoder.py --bench --stdlib      # force the stdlib json backend
+"""
+
+import json
+import time
+import random
+import argparse
+
+
+def stdlib_loads(payload):
+    """json.loads for bytes; decoding to str first skips json's encoding detection"""
+    return json.loads(payload.decode("utf-8"))
+
+
+# Optional fast JSON backends (all accept bytes and raise ValueError subclasses)
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    try:
+        import ujson
+        json_loads = ujson.loads
+        JSON_BACKEND = "ujson"
+    except ImportError:
+        json_loads = stdlib_loads
+        JSON_BACKEND = "json"
+
+KIND_SENSOR = "sensor"
+KIND_JSON = "json"
+KIND_TEXT = "text"
+KIND_BINARY = "binary"
+
+SENSOR_FIELDS = ("sensor_id", "timestamp", "sequence", "temperature", "humidity", "pressure", "battery")
+SENSOR_KEYS = frozenset(SENSOR_FIELDS)
+
+
+class SensorReading:
+    """Compact record for the simulator's sensor schema (dict-like reads)"""
+
+    __slots__ = SENSOR_FIELDS
+
+    def __init__(self, sensor_id, timestamp, sequence, temperature, humidity, pressure, battery):
+        self.sensor_id = sensor_id
+        self.timestamp = timestamp
+        self.sequence = sequence
+        self.temperature = temperature
+        self.humidity = humidity
+        self.pressure = pressure
+        self.battery = battery
+
+    def get(self, field, default=None):
+        if field in SENSOR_KEYS:
+            return getattr(self, field)
+        return default
+
+    def __getitem__(self, field):
+        if field in SENSOR_KEYS:
+            return getattr(self, field)
+        raise KeyError(field)
+
+    def __contains__(self, field):
+        return field in SENSOR_KEYS
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in SENSOR_FIELDS}
+
+    def __repr__(self):
+        return f"SensorReading({self.as_dict()})"
+
+
+def plain(data):
+    """Return a sensor record as a dict (other values unchanged), e.g. for json.dumps"""
+    return data.as_dict() if isinstance(data, SensorReading) else data
+
+
+def is_record(kind, data):
+    """True if a decoded payload is a JSON object or sensor record"""
+    return kind is KIND_SENSOR or (kind is KIND_JSON and isinstance(data, dict))
+
+
+class PayloadDecoder:
+    """Per-topic payload kind cache with a single decode attempt on the fast path"""
+
+    TOPIC_CACHE_LIMIT = 100000
+
+    def __init__(self, records=False):
+        """
+        Initialize payload decoder
+
+        Args:
+            records: Return sensor readings as SensorReading records instead of
+                     dicts (smaller when retained, ~1 us more per message). Without
+                     records the sensor schema is only checked when a topic is learned.
+        """
+        self.records = records
+        self.kinds = {}  # topic -> learned kind
+        self.counts = {KIND_SENSOR: 0, KIND_JSON: 0, KIND_TEXT: 0, KIND_BINARY: 0}
+        self.relearned = 0
+
+    def _learn(self, topic, payload):
+        """Probe a payload the slow way and cache its kind for the topic"""
+        try:
+            data = json_loads(payload)
+        except ValueError:
+            try:
+                data = payload.decode("utf-8")
+                kind = KIND_TEXT
+            except UnicodeDecodeError:
+                data = payload
+                kind = KIND_BINARY
+        else:
+            if type(data) is dict and data.keys() == SENSOR_KEYS:
+                if self.records:
+                    data = SensorReading(**data)
+                kind = KIND_SENSOR
+            else:
+                kind = KIND_JSON
+
+        if topic not in self.kinds and len(self.kinds) >= self.TOPIC_CACHE_LIMIT:
+            self.kinds.clear()
+        self.kinds[topic] = kind
+        return kind, data
+
+    def decode(self, topic, payload):
+        """
+        Decode a payload using the kind learned for its topic
+
+        Args:
+            topic: Message topic
+            payload: Raw payload bytes
+
+        Returns:
+            (kind, data): dict (or SensorReading with records) for sensor,
+            decoded value for json, str for text, the bytes themselves for binary
+        """
+        kind = self.kinds.get(topic)
+        if kind is KIND_SENSOR:
+            try:
+                data = json_loads(payload)
+                if type(data) is dict:
+                    if not self.records:
+                        self.counts[KIND_SENSOR] += 1
+                        return kind, data
+                    if data.keys() == SENSOR_KEYS:
+                        self.counts[KIND_SENSOR] += 1
+                        return kind, SensorReading(**data)
+            except ValueError:
+                pass
+        elif kind is KIND_JSON:
+            try:
+                data = json_loads(payload)
+                self.counts[KIND_JSON] += 1
+                return kind, data
+            except ValueError:
+                pass
+        elif kind is KIND_BINARY:
+            # Only re-probe when the payload looks like it might be JSON
+            if payload[:1] not in (b"{", b"["):
+                self.counts[KIND_BINARY] += 1
+                return kind, payload
+        elif kind is KIND_TEXT:
+            # JSON always decodes as text too, so re-probe anything that may be JSON
+            if payload[:1] not in (b"{", b"["):
+                try:
+                    data = payload.decode("utf-8")
+                    self.counts[KIND_TEXT] += 1
+                    return kind, data
+                except UnicodeDecodeError:
+                    pass
+
+        if kind is not None:
+            self.relearned += 1
+        kind, data = self._learn(topic, payload)
+        self.counts[kind] += 1
+        return kind, data
+
+    def report(self):
+        """Return a one-line summary of decoded kinds"""
+        counts = ", ".join(f"{count} {kind}" for kind, count in self.counts.items())
+        return f"Decoder ({JSON_BACKEND}): {counts} | {len(self.kinds)} topics, {self.relearned} relearned"
+
+
+def decode_uncached(payload):
+    """The original per-message fallback chain, kept for comparison"""
+    try:
+        return json.loads(payload.decode("utf-8"))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        try:
+            return payload.decode("utf-8")
+        except UnicodeDecodeError:
+            return payload
+
+
+def benchmark(messages=100000):
+    """Print per-message decode time by payload kind, cached vs uncached"""
+    from mqtt_render_pubsub import generate_sensor_reading
+
+    workloads = {
+        KIND_SENSOR: [json.dumps(generate_sensor_reading(f"sensor_{i:03d}", i)).encode("utf-8")
+                      for i in range(100)],
+        KIND_JSON: [json.dumps({"door": random.choice(["open", "closed"]), "position": i}).encode("utf-8")
+                    for i in range(100)],
+        KIND_TEXT: [random.choice(["OPEN", "CLOSED", "MOVING"]).encode("utf-8") for _ in range(100)],
+        KIND_BINARY: [bytes([0xff]) + random.randbytes(255) for _ in range(100)],
+    }
+
+    print(f"JSON backend: {JSON_BACKEND}")
+    print(f"{'kind':<8} {'uncached':>12} {'decoder':>12} {'records':>12}")
+    for kind, payloads in workloads.items():
+        topics = [f"bench/{kind}/{i}" for i in range(len(payloads))]
+        count = len(payloads)
+
+        start = time.perf_counter_ns()
+        for i in range(messages):
+            decode_uncached(payloads[i % count])
+        uncached = (time.perf_counter_ns() - start) / messages
+
+        timings = []
+        for records in (False, True):
+            decoder = PayloadDecoder(records)
+            start = time.perf_counter_ns()
+            for i in range(messages):
+                decoder.decode(topics[i % count], payloads[i % count])
+            timings.append((time.perf_counter_ns() - start) / messages)
+
+        print(f"{kind:<8} {uncached:>9.0f} ns {timings[0]:>9.0f} ns {timings[1]:>9.0f} ns")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MQTT payload decoder')
+    parser.add_argument('--bench', action='store_true', help='Benchmark decode time per payload kind')
+    parser.add_argument('--messages', type=int, default=100000,
+                        help='Messages per benchmark case (default: 100000)')
+    parser.add_argument('--stdlib', action='store_true',
+                        help='Benchmark the stdlib json backend even if orjson/ujson is installed')
+
+    args = parser.parse_args()
+
+    if args.stdlib:
+        global json_loads, JSON_BACKEND
+        json_loads, JSON_BACKEND = stdlib_loads, "json"
+
+    if args.bench:
+        benchmark(args.messages)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
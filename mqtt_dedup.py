@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+MQTT Redelivery Deduplication
+Drops QoS1 redeliveries keyed on (sensor_id, sequence) with bounded memory.
+
+Two strategies:
+    window - per-source sliding window bitmap (exact, memory grows with sources)
+    bloom  - time-decayed Bloom filter (fixed memory, configurable false-positive rate)
+
+Usage:
+    # Enable in the subscriber
+    python3 mqtt_subscriber.py --topic "sensors/#" --dedup window --dedup-window 1024
+
+    # Worker groups need hash partitioning: with $share subscriptions the broker
+    # may redeliver a message to a different worker, which never saw the original
+    python3 mqtt_subscriber.py --topic "sensors/#" --dedup window --workers 4 --no-shared
+
+    # Size the dedup stage for 100k sources
+    python3 mqtt_dedup.py --strategy window --sources 100000 --messages 1000000
+    python3 mqtt_dedup.py --strategy bloom --capacity 5000000 --fp-rate 0.0001
+"""
+
+import sys
+import math
+import time
+import random
+import argparse
+from array import array
+
+
+class SlidingWindowDeduplicator:
+    """Exact per-source replay window (one bitmap of recent sequences per source)"""
+
+    def __init__(self, window=1024):
+        """
+        Initialize sliding window deduplicator
+
+        Args:
+            window: Number of sequences behind the highest seen that are remembered
+        """
+        self.window = window
+        self.mask = (1 << window) - 1
+        self.slots = {}           # source -> slot index
+        self.highest = array('q')  # highest sequence per slot
+        self.bitmaps = []         # bit i set = (highest - i) seen
+        self.resets = 0
+
+    def seen(self, source, sequence, now=None):
+        """Record (source, sequence) and return True if it was already seen"""
+        slot = self.slots.get(source)
+        if slot is None:
+            self.slots[source] = len(self.bitmaps)
+            self.highest.append(sequence)
+            self.bitmaps.append(1)
+            return False
+
+        highest = self.highest[slot]
+        if sequence > highest:
+            jump = sequence - highest
+            if jump >= self.window:
+                # Nothing in the window survives; shifting would build a huge integer first
+                self.bitmaps[slot] = 1
+            else:
+                self.bitmaps[slot] = ((self.bitmaps[slot] << jump) | 1) & self.mask
+            self.highest[slot] = sequence
+            return False
+
+        offset = highest - sequence
+        if offset >= self.window:
+            # Far behind the window: the source restarted its sequence
+            self.resets += 1
+            self.highest[slot] = sequence
+            self.bitmaps[slot] = 1
+            return False
+
+        bit = 1 << offset
+        bitmap = self.bitmaps[slot]
+        if bitmap & bit:
+            return True
+        self.bitmaps[slot] = bitmap | bit
+        return False
+
+    def memory_bytes(self):
+        """Approximate memory held by the window state"""
+        size = sys.getsizeof(self.slots) + sys.getsizeof(self.bitmaps) + sys.getsizeof(self.highest)
+        size += sum(sys.getsizeof(source) for source in self.slots)
+        size += sum(sys.getsizeof(bitmap) for bitmap in self.bitmaps)
+        return size
+
+    def describe(self):
+        return f"window={self.window} sources={len(self.bitmaps)} resets={self.resets}"
+
+
+def blocked_fp_rate(capacity, words, hashes):
+    """Expected false-positive rate of a Bloom filter blocked into 64-bit words"""
+    load = capacity / words
+    total = 0.0
+    p = math.exp(-load)
+    for j in range(int(load + 10 * math.sqrt(load) + 30)):
+        if j:
+            p *= load / j
+        total += p * (1 - (63 / 64) ** (hashes * j)) ** hashes
+    return total
+
+
+class DecayingBloomDeduplicator:
+    """Two-generation blocked Bloom filter; entries expire after one to two TTL periods"""
+
+    def __init__(self, capacity=1000000, fp_rate=0.001, ttl=300.0):
+        """
+        Initialize Bloom filter deduplicator
+
+        Each key sets its bits inside a single 64-bit word, so a lookup is two
+        array reads instead of one per hash. The filter is grown until the
+        blocked layout still meets fp_rate.
+
+        Args:
+            capacity: Messages expected per TTL period
+            fp_rate: Target false-positive (wrongly dropped) rate at capacity
+            ttl: Seconds per generation
+        """
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.ttl = ttl
+        bits = -capacity * math.log(fp_rate) / (math.log(2) ** 2)
+        # 6 bits of a 64-bit hash per bit position
+        self.hashes = min(10, max(1, int(round(bits / capacity * math.log(2)))))
+        self.words = max(1, int(math.ceil(bits / 64)))
+        while blocked_fp_rate(capacity, self.words, self.hashes) > fp_rate:
+            self.words = int(self.words * 1.1) + 1
+        self.current = array('Q', bytes(8 * self.words))
+        self.previous = array('Q', bytes(8 * self.words))
+        self.rotated_at = time.monotonic()
+        self.rotations = 0
+
+    def _rotate(self, now):
+        self.previous = self.current
+        self.current = array('Q', bytes(8 * self.words))
+        self.rotated_at = now
+        self.rotations += 1
+
+    def seen(self, source, sequence, now=None):
+        """Record (source, sequence) and return True if it was (probably) already seen"""
+        if now is None:
+            now = time.monotonic()
+        if now - self.rotated_at >= self.ttl:
+            self._rotate(now)
+
+        word = (hash((source, sequence)) & 0xFFFFFFFFFFFFFFFF) % self.words
+        h = hash((sequence, source)) & 0xFFFFFFFFFFFFFFFF
+        mask = 0
+        for _ in range(self.hashes):
+            mask |= 1 << (h & 63)
+            h >>= 6
+
+        value = self.current[word]
+        if value & mask == mask:
+            return True
+        self.current[word] = value | mask
+        return self.previous[word] & mask == mask
+
+    def memory_bytes(self):
+        """Memory held by both filter generations"""
+        return sys.getsizeof(self.current) + sys.getsizeof(self.previous)
+
+    def describe(self):
+        return (f"bloom bits={self.words * 64} hashes={self.hashes} capacity={self.capacity} "
+                f"fp_rate={self.fp_rate} ttl={self.ttl}s rotations={self.rotations}")
+
+
+class DedupStage:
+    """Subscriber stage that extracts (source, sequence) and drops duplicates"""
+
+    def __init__(self, strategy):
+        """
+        Initialize dedup stage
+
+        Args:
+            strategy: SlidingWindowDeduplicator or DecayingBloomDeduplicator
+        """
+        self.strategy = strategy
+        self.messages = 0
+        self.duplicates = 0
+        self.unkeyed = 0
+        self.elapsed_ns = 0
+
+    def check(self, topic, data):
+        """
+        Return True if the message should be processed, False if it is a duplicate
+
+        Args:
+            topic: Topic the message arrived on (used as source when no sensor id)
+            data: Decoded JSON object
+        """
+        start = time.perf_counter_ns()
+        self.messages += 1
+        sequence = data.get("sequence")
+        # Sequences must fit the signed 64-bit window table
+        if not isinstance(sequence, int) or not -2 ** 63 <= sequence < 2 ** 63:
+            self.unkeyed += 1
+            self.elapsed_ns += time.perf_counter_ns() - start
+            return True
+        # str() like the SQLite sink: JSON ids may be lists or objects, which cannot be hashed
+        source = str(data.get("sensor_id") or data.get("id") or topic)
+        duplicate = self.strategy.seen(source, sequence)
+        if duplicate:
+            self.duplicates += 1
+        self.elapsed_ns += time.perf_counter_ns() - start
+        return not duplicate
+
+    def report(self):
+        """Return a one-line summary of dedup cost and effect"""
+        per_message = self.elapsed_ns / self.messages if self.messages else 0
+        memory = self.strategy.memory_bytes()
+        return (f"Dedup: {self.messages} checked, {self.duplicates} duplicates dropped, "
+                f"{self.unkeyed} without sequence | {self.strategy.describe()} | "
+                f"memory {memory / 1024:.1f} KiB, {per_message:.0f} ns/msg")
+
+
+def create_dedup(strategy, window=1024, capacity=1000000, fp_rate=0.001, ttl=300.0):
+    """Build a DedupStage from command line options"""
+    if strategy == "window":
+        return DedupStage(SlidingWindowDeduplicator(window))
+    if strategy == "bloom":
+        return DedupStage(DecayingBloomDeduplicator(capacity, fp_rate, ttl))
+    raise ValueError(f"Unknown dedup strategy '{strategy}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Size the dedup stage with a synthetic workload')
+    parser.add_argument('--strategy', choices=['window', 'bloom'], default='window',
+                        help='Dedup strategy (default: window)')
+    parser.add_argument('--sources', type=int, default=100000, help='Number of sources (default: 100000)')
+    parser.add_argument('--messages', type=int, default=1000000, help='Messages to replay (default: 1000000)')
+    parser.add_argument('--duplicate-rate', type=float, default=0.01,
+                        help='Fraction of messages redelivered (default: 0.01)')
+    parser.add_argument('--window', type=int, default=1024, help='Sliding window size (default: 1024)')
+    parser.add_argument('--capacity', type=int, default=1000000, help='Bloom capacity per TTL (default: 1000000)')
+    parser.add_argument('--fp-rate', type=float, default=0.001, help='Bloom false-positive rate (default: 0.001)')
+    parser.add_argument('--ttl', type=float, default=300.0, help='Bloom generation TTL in seconds (default: 300)')
+
+    args = parser.parse_args()
+
+    stage = create_dedup(args.strategy, args.window, args.capacity, args.fp_rate, args.ttl)
+    sources = [f"sensor_{i:06d}" for i in range(args.sources)]
+    sequences = [0] * args.sources
+    recent = []
+    injected = 0
+
+    print(f"Replaying {args.messages} messages from {args.sources} sources...")
+    for _ in range(args.messages):
+        if recent and random.random() < args.duplicate_rate:
+            data = random.choice(recent)
+            injected += 1
+        else:
+            i = random.randrange(args.sources)
+            sequences[i] += 1
+            data = {"sensor_id": sources[i], "sequence": sequences[i]}
+            if len(recent) < 10000:
+                recent.append(data)
+            else:
+                recent[random.randrange(10000)] = data
+        stage.check("sensors", data)
+
+    print(stage.report())
+    print(f"Injected duplicates: {injected}, dropped: {stage.duplicates}, "
+          f"false drops: {max(0, stage.duplicates - injected)}")
+    print(f"Memory per source: {stage.strategy.memory_bytes() / args.sources:.0f} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+MQTT File Transfer
+Streams large files (firmware, configuration) over MQTT in fixed-size chunks
+with windowed flow control, per-chunk CRC32 and a whole-file SHA-256.
+The receiver writes chunks straight into a preallocated memory-mapped file
+and asks for missing chunks, so interrupted transfers resume.
+
+Topics (per device and transfer):
+    firmware/<device>/<transfer_id>/meta          - JSON description (retained)
+    firmware/<device>/<transfer_id>/chunk/<index> - 12 byte header (offset, crc32) + data
+    firmware/<device>/<transfer_id>/eof           - sender finished a pass
+    firmware/<device>/<transfer_id>/status        - receiver: missing chunks / done
+
+Usage:
+    # Device side: receive into ./firmware
+    python3 mqtt_file_transfer.py --mode receive --host mqtt-xxxxx.render.com --port 12345 --device door_01 --out-dir firmware
+
+    # Push a firmware image
+    python3 mqtt_file_transfer.py --mode send --host mqtt-xxxxx.render.com --port 12345 --device door_01 --file door_fw.bin
+"""
+
+import os
+import sys
+import mmap
+import json
+import time
+import zlib
+import struct
+import hashlib
+import argparse
+import threading
+
+from mqtt_render_pubsub import MQTTRenderBroker
+
+TOPIC_BASE = "firmware/{device}/{transfer_id}"
+CHUNK_HEADER = struct.Struct("<QI")  # offset, crc32 of the data
+
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FileSender:
+    """Publishes a file as chunks and resends whatever the receiver reports missing"""
+
+    def __init__(self, broker, device, path, chunk_size=262144, window=16, transfer_id=None):
+        """
+        Initialize file sender
+
+        Args:
+            broker: Connected MQTTRenderBroker
+            device: Target device id
+            path: File to send
+            chunk_size: Bytes per chunk
+            window: Maximum chunks awaiting PUBACK at once
+            transfer_id: Transfer id (defaults to a prefix of the file's SHA-256,
+                         so a restarted sender resumes the same transfer)
+        """
+        self.broker = broker
+        self.path = path
+        self.chunk_size = chunk_size
+        self.window = window
+        self.size = os.path.getsize(path)
+        self.chunks = max(1, (self.size + chunk_size - 1) // chunk_size)
+        self.sha256 = file_sha256(path)
+        self.transfer_id = transfer_id or self.sha256[:12]
+        self.base = TOPIC_BASE.format(device=device, transfer_id=self.transfer_id)
+        self.status = None
+        self.status_event = threading.Event()
+        self.bytes_sent = 0
+
+    def on_status(self, client, userdata, msg):
+        """Callback for receiver status reports"""
+        try:
+            self.status = json.loads(msg.payload)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return
+        self.status_event.set()
+
+    def _wait_status(self, timeout):
+        """Wait for a status report; clear status_event before publishing what it answers"""
+        if self.status_event.wait(timeout):
+            return self.status
+        return None
+
+    def _send_chunks(self, data, indexes):
+        """Publish chunks keeping at most `window` unacknowledged"""
+        client = self.broker.client
+        outstanding = []
+        for index in indexes:
+            offset = index * self.chunk_size
+            block = data[offset:offset + self.chunk_size]
+            payload = CHUNK_HEADER.pack(offset, zlib.crc32(block)) + block
+            outstanding.append(client.publish(f"{self.base}/chunk/{index}", payload, qos=1))
+            self.bytes_sent += len(block)
+            if len(outstanding) >= self.window:
+                outstanding.pop(0).wait_for_publish(timeout=30)
+        for info in outstanding:
+            info.wait_for_publish(timeout=30)
+
+    def send(self, rounds=5, status_timeout=10.0):
+        """
+        Run the transfer until the receiver confirms it or rounds run out
+
+        Returns:
+            True if the receiver verified the file
+        """
+        client = self.broker.client
+        client.message_callback_add(f"{self.base}/status", self.on_status)
+        client.subscribe(f"{self.base}/status", qos=1)
+
+        meta = {"transfer_id": self.transfer_id, "name": os.path.basename(self.path),
+                "size": self.size, "chunk_size": self.chunk_size, "chunks": self.chunks,
+                "sha256": self.sha256}
+        # Cleared before publishing, so a reply that beats _wait_status() is not lost
+        self.status_event.clear()
+        client.publish(f"{self.base}/meta", json.dumps(meta), qos=1, retain=True).wait_for_publish(timeout=30)
+        print(f"Sending {meta['name']} ({self.size} bytes, {self.chunks} chunks) as {self.transfer_id}")
+
+        # A receiver that already holds part of the file answers the meta with what it is missing
+        status = self._wait_status(1.0)
+        missing = self._missing(status) if status else list(range(self.chunks))
+
+        start = time.time()
+        with open(self.path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+            try:
+                for round_number in range(1, rounds + 1):
+                    if missing is None:
+                        break
+                    print(f"Round {round_number}: sending {len(missing)} chunk(s)")
+                    self._send_chunks(data, missing)
+                    self.status_event.clear()
+                    client.publish(f"{self.base}/eof", str(round_number), qos=1)
+                    status = self._wait_status(status_timeout)
+                    if status is None:
+                        print("✗ No status from receiver")
+                        continue
+                    missing = self._missing(status)
+            finally:
+                if self.size:
+                    data.close()
+
+        elapsed = time.time() - start
+        done = missing is None
+        if done:
+            # Clear the retained meta so new receivers do not pick the transfer up again
+            client.publish(f"{self.base}/meta", b"", qos=1, retain=True)
+            rate = self.bytes_sent / elapsed / 1e6 if elapsed else 0
+            print(f"✓ Transfer verified by receiver ({self.bytes_sent} bytes sent in {elapsed:.1f}s, {rate:.2f} MB/s)")
+        else:
+            print("✗ Transfer incomplete")
+        return done
+
+    def _missing(self, status):
+        """Chunk indexes to resend from a status report, or None when done"""
+        if status.get("done"):
+            return None
+        if status.get("error"):
+            print(f"✗ Receiver error: {status['error']}")
+            return list(range(self.chunks))
+        missing = []
+        for first, last in status.get("missing", []):
+            missing.extend(range(first, last + 1))
+        return missing
+
+
+def check_meta(meta):
+    """
+    Validate a transfer description before anything is allocated for it
+
+    Raises:
+        ValueError: A field is missing, has the wrong type or is inconsistent
+    """
+    if not isinstance(meta, dict):
+        raise ValueError("meta is not a JSON object")
+    for field, kind in (("transfer_id", str), ("name", str), ("sha256", str),
+                        ("size", int), ("chunk_size", int), ("chunks", int)):
+        if type(meta.get(field)) is not kind:
+            raise ValueError(f"missing or invalid '{field}'")
+    if not meta["transfer_id"].isascii() or not os.path.basename(meta["name"]):
+        raise ValueError("invalid transfer id or file name")
+    size, chunk_size = meta["size"], meta["chunk_size"]
+    if size < 0 or chunk_size <= 0:
+        raise ValueError("invalid size or chunk size")
+    # The sender always announces at least one chunk, even for an empty file
+    if meta["chunks"] != max(1, (size + chunk_size - 1) // chunk_size):
+        raise ValueError(f"{meta['chunks']} chunks do not match size {size} / chunk size {chunk_size}")
+
+
+class IncomingTransfer:
+    """One file being reassembled into a preallocated memory-mapped file"""
+
+    def __init__(self, meta, out_dir):
+        self.meta = meta
+        self.chunks = meta["chunks"]
+        self.chunk_size = meta["chunk_size"]
+        self.size = meta["size"]
+        self.final_path = os.path.join(out_dir, os.path.basename(meta["name"]))
+        self.part_path = self.final_path + ".part"
+        self.state_path = self.part_path + ".state"
+        self.received = bytearray(self.chunks)
+        self.count = 0
+        self.done = False
+
+        # Resume a previous attempt of the same transfer
+        if os.path.exists(self.state_path) and os.path.exists(self.part_path):
+            with open(self.state_path, "rb") as f:
+                state = f.read()
+            if state[:len(meta["transfer_id"])].decode("ascii", "replace") == meta["transfer_id"]:
+                bitmap = state[len(meta["transfer_id"]):]
+                if len(bitmap) == self.chunks:
+                    self.received[:] = bitmap
+                    self.count = sum(self.received)
+
+        self.file = open(self.part_path, "r+b" if self.count else "w+b")
+        self.file.truncate(self.size)
+        self.mm = mmap.mmap(self.file.fileno(), self.size) if self.size else None
+
+    def write_chunk(self, index, payload):
+        """
+        Copy one chunk into place
+
+        Returns:
+            False if the chunk failed its checks
+        """
+        if index >= self.chunks or len(payload) < CHUNK_HEADER.size:
+            return False
+        view = memoryview(payload)
+        offset, crc = CHUNK_HEADER.unpack_from(view)
+        data = view[CHUNK_HEADER.size:]
+        if offset != index * self.chunk_size or offset + len(data) > self.size or zlib.crc32(data) != crc:
+            return False
+        if not self.received[index]:
+            # An empty file has no mapping (and its single chunk no data)
+            if len(data):
+                self.mm[offset:offset + len(data)] = data
+            self.received[index] = 1
+            self.count += 1
+        return True
+
+    def missing_ranges(self):
+        """Missing chunk indexes as [first, last] ranges"""
+        ranges = []
+        index = self.received.find(0)
+        while index != -1:
+            end = self.received.find(1, index)
+            end = self.chunks if end == -1 else end
+            ranges.append([index, end - 1])
+            index = self.received.find(0, end)
+        return ranges
+
+    def save_state(self):
+        """Persist the received-chunk bitmap for resume"""
+        with open(self.state_path, "wb") as f:
+            f.write(self.meta["transfer_id"].encode("ascii") + bytes(self.received))
+
+    def finish(self):
+        """
+        Verify the SHA-256 and move the file into place
+
+        Returns:
+            True if the file verified
+        """
+        digest = hashlib.sha256(self.mm if self.mm is not None else b"").hexdigest()
+        if digest != self.meta["sha256"]:
+            # Start over: the bitmap cannot tell which chunk is wrong
+            self.received[:] = bytes(self.chunks)
+            self.count = 0
+            return False
+        self.close()
+        os.replace(self.part_path, self.final_path)
+        if os.path.exists(self.state_path):
+            os.unlink(self.state_path)
+        self.done = True
+        return True
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.flush()
+            self.mm.close()
+            self.mm = None
+        if not self.file.closed:
+            self.file.close()
+
+
+class FileReceiver:
+    """Device-side receiver for chunked transfers addressed to one device"""
+
+    def __init__(self, broker, device, out_dir):
+        """
+        Initialize file receiver
+
+        Args:
+            broker: Connected MQTTRenderBroker
+            device: Device id to receive for
+            out_dir: Directory for completed files
+        """
+        self.broker = broker
+        self.device = device
+        self.out_dir = out_dir
+        self.transfers = {}
+
+    def start(self):
+        """Subscribe to this device's transfer topics"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        client = self.broker.client
+        base = TOPIC_BASE.format(device=self.device, transfer_id="+")
+        for suffix, callback in (("meta", self.on_meta), ("chunk/+", self.on_chunk), ("eof", self.on_eof)):
+            client.message_callback_add(f"{base}/{suffix}", callback)
+            client.subscribe(f"{base}/{suffix}", qos=1)
+        print(f"✓ Receiving transfers for {self.device} into {self.out_dir}")
+
+    def _status(self, transfer_id, status):
+        base = TOPIC_BASE.format(device=self.device, transfer_id=transfer_id)
+        self.broker.client.publish(f"{base}/status", json.dumps(status), qos=1)
+
+    def on_meta(self, client, userdata, msg):
+        """Callback for a transfer description: preallocate and report state"""
+        if not msg.payload:
+            return
+        try:
+            meta = json.loads(msg.payload)
+            check_meta(meta)
+        except ValueError as e:  # also JSON and UTF-8 decode errors
+            print(f"✗ Malformed transfer meta on '{msg.topic}': {e}")
+            return
+        transfer_id = meta["transfer_id"]
+        transfer = self.transfers.get(transfer_id)
+        if transfer is None or transfer.done:
+            try:
+                transfer = self.transfers[transfer_id] = IncomingTransfer(meta, self.out_dir)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self._status(transfer_id, {"error": str(e)})
+                return
+            print(f"Incoming {meta['name']} ({meta['size']} bytes), "
+                  f"{transfer.count}/{transfer.chunks} chunks already present")
+        if transfer.count:
+            self._status(transfer_id, {"missing": transfer.missing_ranges()})
+
+    def on_chunk(self, client, userdata, msg):
+        """Callback for a chunk: write it into the mapped file"""
+        parts = msg.topic.split("/")
+        transfer = self.transfers.get(parts[2])
+        if transfer is None or transfer.done:
+            return
+        # isdecimal() rather than isdigit(): int() rejects digits like "²"
+        if not parts[4].isdecimal() or not transfer.write_chunk(int(parts[4]), msg.payload):
+            print(f"✗ Rejected chunk {parts[4]} of {parts[2]}")
+
+    def on_eof(self, client, userdata, msg):
+        """Callback when the sender finished a pass: verify or report gaps"""
+        transfer_id = msg.topic.split("/")[2]
+        transfer = self.transfers.get(transfer_id)
+        if transfer is None:
+            return
+        if transfer.done:
+            self._status(transfer_id, {"done": True})
+            return
+        if transfer.count == transfer.chunks:
+            if transfer.finish():
+                print(f"✓ Received {transfer.final_path} (sha256 verified)")
+                self._status(transfer_id, {"done": True})
+                return
+            print(f"✗ Checksum mismatch for {transfer.final_path}, requesting full resend")
+        else:
+            transfer.save_state()
+        self._status(transfer_id, {"missing": transfer.missing_ranges()})
+
+    def close(self):
+        """Save resume state for unfinished transfers"""
+        for transfer in self.transfers.values():
+            if not transfer.done:
+                transfer.save_state()
+                transfer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MQTT chunked file transfer')
+    parser.add_argument('--mode', choices=['send', 'receive'], required=True, help='Operating mode')
+    parser.add_argument('--host', default='localhost', help='MQTT broker host (default: localhost)')
+    parser.add_argument('--port', type=int, default=1883, help='MQTT broker port (default: 1883)')
+    parser.add_argument('--username', default='admin', help='MQTT username (default: admin)')
+    parser.add_argument('--password', default='password', help='MQTT password (default: password)')
+    parser.add_argument('--device', required=True, help='Target device id')
+    parser.add_argument('--file', help='File to send (send mode)')
+    parser.add_argument('--chunk-size', type=int, default=262144, help='Bytes per chunk (default: 262144)')
+    parser.add_argument('--window', type=int, default=16, help='Chunks in flight (default: 16)')
+    parser.add_argument('--transfer-id', help='Transfer id (default: derived from the file hash)')
+    parser.add_argument('--out-dir', default='.', help='Directory for received files (default: .)')
+
+    args = parser.parse_args()
+
+    broker = MQTTRenderBroker(args.host, args.port, args.username, args.password)
+    if not broker.connect():
+        sys.exit(1)
+
+    try:
+        if args.mode == 'send':
+            if not args.file:
+                parser.error("--file is required in send mode")
+            sender = FileSender(broker, args.device, args.file, args.chunk_size, args.window, args.transfer_id)
+            success = sender.send()
+        else:
+            receiver = FileReceiver(broker, args.device, args.out_dir)
+            receiver.start()
+            print("\n=== Waiting for transfers (Ctrl+C to exit) ===\n")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                print("\n\nInterrupted by user")
+            finally:
+                receiver.close()
+            success = True
+    finally:
+        broker.disconnect()
+
+    sys.exit(0 if success else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+MQTT Broker Health Probe
+Checks that the broker actually delivers messages, not just that the port is
+open: an authenticated client publishes to its own private topic
+($health/<client id>), waits for the message to come back and compares the
+round-trip time with an SLO.
+
+Sidecar mode keeps one connection open and probes every --interval seconds,
+writing the result to a status file; --check-file then answers container
+health checks from that file without opening a new connection each time.
+
+Usage:
+    # One-shot probe (exit 0 when the round trip is within the SLO)
+    python3 mqtt_health_probe.py --host localhost --port 1883 --slo-ms 250
+
+    # Sidecar next to the broker, plus the health check command
+    python3 mqtt_health_probe.py --sidecar --interval 5 --status-file /tmp/mqtt-health.json
+    python3 mqtt_health_probe.py --check-file /tmp/mqtt-health.json --max-age 30
+
+Credentials default to the MQTT_USERNAME / MQTT_PASSWORD environment variables.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+
+# Optional: without paho-mqtt only --check-file is available
+try:
+    from mqtt_subscriber import MQTTSubscriber
+except ImportError:
+    MQTTSubscriber = None
+
+
+class HealthProbe(MQTTSubscriber or object):
+    """Round-trip probe over a private topic on a persistent subscriber connection"""
+
+    def __init__(self, broker_host, broker_port, username, password, prefix="$health",
+                 slo_ms=500.0, timeout=5.0, client_id=None):
+        """
+        Initialize health probe
+
+        Args:
+            broker_host: MQTT broker host/IP
+            broker_port: MQTT broker port
+            username: MQTT username
+            password: MQTT password
+            prefix: Topic prefix for probe messages
+            slo_ms: Round-trip time above which the broker counts as unhealthy
+            timeout: Seconds to wait for a probe to come back
+            client_id: MQTT client id (default: mqtt-health-<host>-<pid>)
+        """
+        client_id = client_id or f"mqtt-health-{socket.gethostname()}-{os.getpid()}"
+        super().__init__(broker_host, broker_port, username, password, client_id)
+        self.quiet = True
+        self.topic = f"{prefix}/{client_id}"
+        self.slo_ms = slo_ms
+        self.timeout = timeout
+        self.counter = 0
+        self.expected = None
+        self.received_at = None
+        self.reply = threading.Event()
+        self.subscribed = threading.Event()
+
+    def on_connect(self, client, userdata, flags, rc):
+        """Resubscribe to the probe topic on every (re)connect"""
+        # Probes must wait for the new SUBACK, not pass on the previous session's
+        self.subscribed.clear()
+        super().on_connect(client, userdata, flags, rc)
+        if rc == 0:
+            client.subscribe(self.topic, qos=1)
+
+    def on_subscribe(self, client, userdata, mid, granted_qos):
+        self.subscribed.set()
+
+    def on_message(self, client, userdata, msg):
+        if msg.payload == self.expected:
+            self.received_at = time.perf_counter()
+            self.reply.set()
+
+    def probe(self):
+        """
+        Publish one probe and wait for it to come back
+
+        Returns:
+            Status dict: status (ok, slow or fail), rtt_ms, slo_ms, checked_at, error
+        """
+        result = {"status": "fail", "rtt_ms": None, "slo_ms": self.slo_ms,
+                  "checked_at": time.time(), "error": None}
+        if not self.connected:
+            result["error"] = "not connected"
+            return result
+        if not self.subscribed.wait(self.timeout):
+            result["error"] = "subscription not acknowledged"
+            return result
+
+        self.counter += 1
+        self.expected = f"{self.counter}:{result['checked_at']}".encode("utf-8")
+        self.reply.clear()
+        sent_at = time.perf_counter()
+        info = self.client.publish(self.topic, self.expected, qos=1)
+        if info.rc != 0:
+            result["error"] = f"publish failed ({info.rc})"
+            return result
+
+        if not self.reply.wait(self.timeout):
+            result["error"] = f"no round trip within {self.timeout}s"
+            return result
+
+        rtt_ms = (self.received_at - sent_at) * 1000
+        result["rtt_ms"] = round(rtt_ms, 2)
+        if rtt_ms <= self.slo_ms:
+            result["status"] = "ok"
+        else:
+            result["status"] = "slow"
+            result["error"] = f"round trip {rtt_ms:.0f} ms above SLO {self.slo_ms:.0f} ms"
+        return result
+
+    def disconnect(self):
+        self.subscribed.clear()
+        super().disconnect()
+        self.client = None
+
+
+def write_status(path, status):
+    """Write the status file atomically"""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp, path)
+
+
+def check_file(path, max_age):
+    """
+    Evaluate a sidecar status file
+
+    Returns:
+        (healthy, message)
+    """
+    try:
+        with open(path) as f:
+            status = json.load(f)
+    except (OSError, ValueError) as e:
+        return False, f"no probe status: {e}"
+    age = time.time() - status.get("checked_at", 0)
+    if age > max_age:
+        return False, f"probe status is {age:.0f}s old"
+    if status.get("status") != "ok":
+        return False, f"{status.get('status')}: {status.get('error')}"
+    return True, f"ok: round trip {status['rtt_ms']} ms (SLO {status['slo_ms']} ms)"
+
+
+def create_probe(args):
+    return HealthProbe(args.host, args.port, args.username, args.password,
+                       args.prefix, args.slo_ms, args.timeout)
+
+
+def run_once(args):
+    """Connect, probe once and disconnect; returns the exit code"""
+    probe = create_probe(args)
+    try:
+        if not probe.connect():
+            print(f"✗ fail: cannot connect to {args.host}:{args.port}")
+            return 1
+        result = probe.probe()
+    finally:
+        probe.disconnect()
+    if result["status"] == "ok":
+        print(f"✓ ok: round trip {result['rtt_ms']} ms (SLO {args.slo_ms:.0f} ms)")
+        return 0
+    print(f"✗ {result['status']}: {result['error']}")
+    return 1
+
+
+def run_sidecar(args):
+    """Probe every --interval seconds on one connection and keep the status file current"""
+    probe = create_probe(args)
+    failures = 0
+    probes = 0
+    try:
+        while True:
+            if probe.client is None and not probe.connect():
+                # Let the next round retry with a fresh client
+                probe.disconnect()
+            result = probe.probe()
+            probes += 1
+            failures = 0 if result["status"] == "ok" else failures + 1
+            result.update({"host": args.host, "port": args.port, "probes": probes,
+                           "consecutive_failures": failures})
+            if args.status_file:
+                write_status(args.status_file, result)
+            if result["status"] != "ok" or args.verbose:
+                print(f"[{time.strftime('%H:%M:%S')}] {result['status']} "
+                      f"rtt={result['rtt_ms']} ms {result['error'] or ''}".rstrip())
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        probe.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MQTT broker round-trip health probe')
+    parser.add_argument('--host', default=os.environ.get('MQTT_HOST', 'localhost'),
+                        help='MQTT broker host (default: $MQTT_HOST or localhost)')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('MQTT_PORT', 1883)),
+                        help='MQTT broker port (default: $MQTT_PORT or 1883)')
+    parser.add_argument('--username', default=os.environ.get('MQTT_USERNAME', 'admin'),
+                        help='MQTT username (default: $MQTT_USERNAME or admin)')
+    parser.add_argument('--password', default=os.environ.get('MQTT_PASSWORD', 'password'),
+                        help='MQTT password (default: $MQTT_PASSWORD or password)')
+    parser.add_argument('--prefix', default='$health', help='Probe topic prefix (default: $health)')
+    parser.add_argument('--slo-ms', type=float, default=500.0,
+                        help='Maximum healthy round trip in milliseconds (default: 500)')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='Seconds to wait for a probe to come back (default: 5)')
+    parser.add_argument('--sidecar', action='store_true', help='Probe continuously on one connection')
+    parser.add_argument('--interval', type=float, default=5.0, help='Seconds between sidecar probes (default: 5)')
+    parser.add_argument('--status-file', help='Sidecar status file to write')
+    parser.add_argument('--check-file', help='Exit 0/1 from a sidecar status file instead of probing')
+    parser.add_argument('--max-age', type=float, default=30.0,
+                        help='Maximum age in seconds of a status file for --check-file (default: 30)')
+    parser.add_argument('--verbose', action='store_true', help='Print every sidecar probe')
+
+    args = parser.parse_args()
+
+    if args.check_file:
+        healthy, message = check_file(args.check_file, args.max_age)
+        print(f"{'✓' if healthy else '✗'} {message}")
+        sys.exit(0 if healthy else 1)
+    if MQTTSubscriber is None:
+        parser.error("probing requires paho-mqtt (only --check-file works without it)")
+    if args.sidecar:
+        run_sidecar(args)
+    else:
+        sys.exit(run_once(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+MQTT Last-Value Cache
+Keeps the latest payload and receive time of every topic, snapshots it to a
+compact file and restores it on startup so a restarted consumer knows door and
+sensor state immediately. Current state is served over a local Unix socket.
+
+Usage:
+    # Run the cache inside the subscriber
+    python3 mqtt_subscriber.py --all --quiet --cache-snapshot lvc.bin --cache-socket /tmp/mqtt-lvc.sock
+
+    # Query a running subscriber
+    python3 mqtt_last_value_cache.py --socket /tmp/mqtt-lvc.sock --filter "doors/+/state"
+
+    # Query a snapshot file offline
+    python3 mqtt_last_value_cache.py --snapshot lvc.bin --filter "sensors/#"
+"""
+
+import os
+import json
+import time
+import zlib
+import base64
+import socket
+import struct
+import argparse
+import threading
+import socketserver
+from datetime import datetime
+
+from paho.mqtt.client import topic_matches_sub
+
+SNAPSHOT_MAGIC = b"LVC1"
+ENTRY_HEADER = struct.Struct("<dHI")  # received_at, topic length, payload length
+
+
+def encode_snapshot(entries):
+    """Serialize {topic: (payload, received_at)} into the compressed snapshot format"""
+    parts = [SNAPSHOT_MAGIC, struct.pack("<I", len(entries))]
+    body = []
+    for topic, (payload, received_at) in entries.items():
+        topic_bytes = topic.encode("utf-8")
+        body.append(ENTRY_HEADER.pack(received_at, len(topic_bytes), len(payload)))
+        body.append(topic_bytes)
+        body.append(payload)
+    parts.append(zlib.compress(b"".join(body), 1))
+    return b"".join(parts)
+
+
+def decode_snapshot(data):
+    """Parse a snapshot produced by encode_snapshot()"""
+    if data[:4] != SNAPSHOT_MAGIC:
+        raise ValueError("Not a last-value cache snapshot")
+    count = struct.unpack_from("<I", data, 4)[0]
+    body = memoryview(zlib.decompress(data[8:]))
+    entries = {}
+    offset = 0
+    for _ in range(count):
+        received_at, topic_len, payload_len = ENTRY_HEADER.unpack_from(body, offset)
+        offset += ENTRY_HEADER.size
+        topic = bytes(body[offset:offset + topic_len]).decode("utf-8")
+        offset += topic_len
+        entries[topic] = (bytes(body[offset:offset + payload_len]), received_at)
+        offset += payload_len
+    return entries
+
+
+def entry_to_json(topic, payload, received_at):
+    """Render one cache entry as a JSON-serializable dict"""
+    entry = {"topic": topic, "received_at": received_at}
+    try:
+        entry["payload"] = payload.decode("utf-8")
+    except UnicodeDecodeError:
+        entry["payload_b64"] = base64.b64encode(payload).decode("ascii")
+    return entry
+
+
+class LastValueCache:
+    """Latest payload per topic with periodic snapshots and a local query socket"""
+
+    def __init__(self, snapshot_path=None, snapshot_interval=30.0, socket_path=None):
+        """
+        Initialize last-value cache
+
+        Args:
+            snapshot_path: Snapshot file (restored on start, written periodically)
+            snapshot_interval: Seconds between snapshots
+            socket_path: Unix socket path for state queries (optional)
+        """
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.socket_path = socket_path
+        self.entries = {}
+        self.dirty = False
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.server = None
+
+    def update(self, topic, payload, received_at=None):
+        """Record a topic's latest payload (called on the MQTT network thread)"""
+        self.entries[topic] = (bytes(payload), received_at or time.time())
+        self.dirty = True
+
+    def query(self, topic_filter="#"):
+        """
+        Return [(topic, payload, received_at)] for topics matching an MQTT filter
+
+        Args:
+            topic_filter: MQTT topic filter (supports # and + wildcards)
+        """
+        # dict() copies atomically under the GIL while the network thread writes
+        entries = dict(self.entries)
+        return [(topic, payload, received_at)
+                for topic, (payload, received_at) in sorted(entries.items())
+                if topic_matches_sub(topic_filter, topic)]
+
+    def restore(self):
+        """Load the snapshot file if it exists"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                self.entries = decode_snapshot(f.read())
+        except (OSError, ValueError, zlib.error, struct.error) as e:
+            print(f"✗ Could not restore snapshot: {e}")
+            return 0
+        print(f"✓ Restored {len(self.entries)} topics from {self.snapshot_path}")
+        return len(self.entries)
+
+    def snapshot(self):
+        """Write the cache to the snapshot file atomically"""
+        if not self.snapshot_path:
+            return
+        self.dirty = False
+        data = encode_snapshot(dict(self.entries))
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.snapshot_path)
+
+    def _snapshot_loop(self):
+        while not self.stop_event.wait(self.snapshot_interval):
+            if self.dirty:
+                try:
+                    self.snapshot()
+                except OSError as e:
+                    print(f"✗ Snapshot error: {e}")
+
+    def start(self):
+        """Restore the snapshot, then start the snapshot thread and query socket"""
+        self.restore()
+        if self.snapshot_path:
+            self.thread = threading.Thread(target=self._snapshot_loop, name="lvc-snapshot", daemon=True)
+            self.thread.start()
+        if self.socket_path:
+            self._start_server()
+
+    def _start_server(self):
+        cache = self
+
+        class QueryHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                topic_filter = self.rfile.readline().decode("utf-8").strip() or "#"
+                for topic, payload, received_at in cache.query(topic_filter):
+                    line = json.dumps(entry_to_json(topic, payload, received_at)) + "\n"
+                    self.wfile.write(line.encode("utf-8"))
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, QueryHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="lvc-socket", daemon=True).start()
+        print(f"✓ Last-value cache serving queries on {self.socket_path}")
+
+    def close(self):
+        """Stop background threads and write a final snapshot"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            os.unlink(self.socket_path)
+            self.server = None
+        if self.snapshot_path:
+            self.snapshot()
+            print(f"Last-value cache: {len(self.entries)} topics saved to {self.snapshot_path}")
+
+
+def query_socket(socket_path, topic_filter="#", timeout=5.0):
+    """Query a running cache over its Unix socket and return a list of entry dicts"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(topic_filter.encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            return [json.loads(line) for line in f]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the MQTT last-value cache')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--socket', help='Unix socket of a running subscriber')
+    source.add_argument('--snapshot', help='Snapshot file to read offline')
+    parser.add_argument('--filter', default='#', help='MQTT topic filter (default: #)')
+    parser.add_argument('--json', action='store_true', help='Print entries as JSON lines')
+
+    args = parser.parse_args()
+
+    if args.socket:
+        entries = query_socket(args.socket, args.filter)
+    else:
+        with open(args.snapshot, "rb") as f:
+            cache = decode_snapshot(f.read())
+        entries = [entry_to_json(topic, payload, received_at)
+                   for topic, (payload, received_at) in sorted(cache.items())
+                   if topic_matches_sub(args.filter, topic)]
+
+    for entry in entries:
+        if args.json:
+            print(json.dumps(entry))
+        else:
+            stamp = datetime.fromtimestamp(entry["received_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            payload = entry.get("payload", f"[Binary data: {len(entry.get('payload_b64', ''))} base64 chars]")
+            print(f"[{stamp}] {entry['topic']}: {payload}")
+    print(f"\n{len(entries)} topics")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+MQTT Client Microbenchmarks
+Times the per-message hot paths of the client scripts offline: reading
+generation, JSON payload construction (dict + json.dumps and precompiled
+templates), topic formatting, on_message decode/print and publish() against
+a local null broker (a tiny TCP server that only answers
+CONNACK/PUBACK/SUBACK/PINGRESP).
+
+Each case is calibrated to --min-time per round and repeated for --rounds;
+the median and interquartile range are reported. QoS 1 publish cases wait for
+their PUBACKs every --ack-window messages, so they time the steady state
+rather than appends to paho's unbounded outgoing queue. Results can be saved as a
+baseline and later compared, failing when a case got slower than --threshold.
+
+Usage:
+    python3 mqtt_microbench.py
+    python3 mqtt_microbench.py --save baseline.json
+    python3 mqtt_microbench.py --compare baseline.json --threshold 10
+    python3 mqtt_microbench.py --filter on_message --rounds 30
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import struct
+import platform
+import argparse
+import statistics
+import contextlib
+import socketserver
+import multiprocessing
+
+from mqtt_decoder import JSON_BACKEND
+
+
+class NullBrokerHandler(socketserver.StreamRequestHandler):
+    """Minimal MQTT 3.1.1 peer: acknowledges everything and discards payloads"""
+
+    def handle(self):
+        read = self.rfile.read
+        write = self.wfile.write
+        while True:
+            header = read(1)
+            if not header:
+                return
+            length, multiplier = 0, 1
+            while True:
+                byte = read(1)
+                if not byte:
+                    return
+                length += (byte[0] & 127) * multiplier
+                multiplier *= 128
+                if byte[0] < 128:
+                    break
+            body = read(length)
+            packet_type = header[0] >> 4
+
+            if packet_type == 1:     # CONNECT -> CONNACK
+                write(b"\x20\x02\x00\x00")
+            elif packet_type == 3:   # PUBLISH -> PUBACK / PUBREC
+                qos = (header[0] >> 1) & 3
+                if qos:
+                    offset = 2 + struct.unpack_from(">H", body)[0]
+                    write((b"\x40\x02" if qos == 1 else b"\x50\x02") + body[offset:offset + 2])
+            elif packet_type == 6:   # PUBREL -> PUBCOMP
+                write(b"\x70\x02" + body[:2])
+            elif packet_type == 8:   # SUBSCRIBE -> SUBACK granting requested QoS
+                granted = bytearray()
+                offset = 2
+                while offset < len(body):
+                    offset += 2 + struct.unpack_from(">H", body, offset)[0]
+                    granted.append(body[offset])
+                    offset += 1
+                write(bytes([0x90, 2 + len(granted)]) + body[:2] + bytes(granted))
+            elif packet_type == 12:  # PINGREQ -> PINGRESP
+                write(b"\xd0\x00")
+            elif packet_type == 14:  # DISCONNECT
+                return
+
+
+def serve_null_broker(port_queue):
+    """Process body: run the null broker on an ephemeral port and report the port"""
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), NullBrokerHandler)
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+class NullBroker:
+    """Null broker in a separate process, so it does not compete for the GIL"""
+
+    def __init__(self):
+        self.process = None
+        self.port = None
+
+    def start(self):
+        port_queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=serve_null_broker, args=(port_queue,),
+                                               name="null-broker", daemon=True)
+        self.process.start()
+        self.port = port_queue.get(timeout=10)
+        return self.port
+
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+
+
+class FakeMessage:
+    """Stand-in for paho's MQTTMessage"""
+
+    def __init__(self, topic, payload, qos=1):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+
+
+class AckWindow:
+    """Tracks a client's QoS>0 publishes and waits for their acks in batches"""
+
+    def __init__(self, client, size=20, timeout=10.0):
+        """
+        Initialize ack window
+
+        Args:
+            client: paho client whose publish() is wrapped
+            size: Unacknowledged messages allowed before waiting (paho's max_inflight is 20)
+            timeout: Seconds to wait for a batch of acks before the case fails
+        """
+        self.size = size
+        self.timeout = timeout
+        self.pending = []
+        publish = client.publish
+
+        def tracked(topic, payload=None, qos=0, retain=False):
+            info = publish(topic, payload, qos, retain)
+            if qos:
+                self.pending.append(info)
+            return info
+
+        client.publish = tracked
+
+    def bound(self, fn):
+        """Wrap a case so it drains the window whenever it is full"""
+        def case():
+            fn()
+            if len(self.pending) >= self.size:
+                self.drain()
+        return case
+
+    def drain(self):
+        deadline = time.monotonic() + self.timeout
+        for info in self.pending:
+            info.wait_for_publish(timeout=max(0.0, deadline - time.monotonic()))
+            if not info.is_published():
+                self.pending.clear()
+                raise RuntimeError(f"no PUBACK within {self.timeout:g}s (null broker gone?)")
+        self.pending.clear()
+
+
+def build_cases(port=None, ack_window=20):
+    """
+    Create the benchmark cases
+
+    Args:
+        port: Null broker port; publish cases are skipped when None
+        ack_window: QoS 1 messages published before waiting for their PUBACKs
+
+    Returns:
+        ([(name, callable)], [objects to disconnect afterwards])
+    """
+    from mqtt_render_pubsub import generate_sensor_reading, MQTTRenderBroker
+    from mqtt_subscriber import MQTTSubscriber
+    from mqtt_sensor_simulator import SensorSimulator
+    from mqtt_payload_template import SensorPayloadTemplate, sensor_values
+
+    reading = generate_sensor_reading("sensor_001", 1)
+    payload = json.dumps(reading).encode("utf-8")
+    topic = "sensors/sensor_001/data"
+    message = FakeMessage(topic, payload)
+    text_message = FakeMessage("doors/door_001/state", b"OPEN")
+    sensor_id = "sensor_001"
+    topic_base = "sensors"
+
+    quiet_subscriber = MQTTSubscriber("127.0.0.1", 0, "bench", "bench")
+    quiet_subscriber.quiet = True
+    print_subscriber = MQTTSubscriber("127.0.0.1", 0, "bench", "bench")
+    pubsub = MQTTRenderBroker("127.0.0.1", 0, "bench", "bench")
+    template = SensorPayloadTemplate(topic_base)
+    slot = template.slot(sensor_id)
+    values = sensor_values(1)
+
+    cases = [
+        ("generate_reading", lambda: generate_sensor_reading(sensor_id, 1)),
+        ("json_dumps", lambda: json.dumps(reading)),
+        ("topic_format", lambda: f"{topic_base}/{sensor_id}/data"),
+        ("build_payload_dict", lambda: json.dumps(generate_sensor_reading(sensor_id, 1))),
+        ("build_payload_template", lambda: template.render(slot, 1, *sensor_values(1))),
+        ("template_render", lambda: template.render(slot, 1, *values)),
+        ("on_message_quiet", lambda: quiet_subscriber.on_message(None, None, message)),
+        ("on_message_text_quiet", lambda: quiet_subscriber.on_message(None, None, text_message)),
+        ("on_message_print", lambda: print_subscriber.on_message(None, None, message)),
+        ("pubsub_on_message_print", lambda: pubsub.on_message(None, None, message)),
+    ]
+    clients = []
+
+    if port is not None:
+        broker = MQTTRenderBroker("127.0.0.1", port, "bench", "bench")
+        simulator = SensorSimulator("127.0.0.1", port, "bench", "bench", client_id="microbench-simulator")
+        template_simulator = SensorSimulator("127.0.0.1", port, "bench", "bench",
+                                             client_id="microbench-template-simulator")
+        template_simulator.template = SensorPayloadTemplate(topic_base)
+        with contextlib.redirect_stdout(io.StringIO()):
+            connected = broker.connect() and simulator.connect() and template_simulator.connect()
+        if connected:
+            clients.extend([broker, simulator, template_simulator])
+            broker_acks, simulator_acks, template_acks = (
+                AckWindow(client.client, ack_window) for client in clients)
+            message_text = payload.decode("utf-8")
+            cases.extend([
+                ("publish_qos0", lambda: broker.publish(topic, message_text, qos=0, quiet=True)),
+                ("publish_qos1", broker_acks.bound(
+                    lambda: broker.publish(topic, message_text, qos=1, quiet=True))),
+                ("publish_sensor_data", simulator_acks.bound(
+                    lambda: simulator.publish_sensor_data(sensor_id, topic_base))),
+                ("publish_sensor_data_template", template_acks.bound(
+                    lambda: template_simulator.publish_sensor_data(sensor_id, topic_base))),
+            ])
+        else:
+            print("✗ Could not connect to the null broker, skipping publish cases")
+    return cases, clients
+
+
+def time_case(fn, rounds=15, min_time=0.05):
+    """
+    Time one case and return per-call nanoseconds for each round
+
+    The iteration count is doubled until one round takes at least min_time,
+    then one warmup round is discarded.
+
+    Raises:
+        RuntimeError: The case failed (e.g. publish acks timed out)
+    """
+    iterations = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9:
+            break
+        iterations *= 2
+
+    samples = []
+    for _ in range(rounds + 1):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter_ns() - start) / iterations)
+    return samples[1:]
+
+
+def summarize(samples):
+    """Median and interquartile range of a list of timings"""
+    q1, median, q3 = statistics.quantiles(samples, n=4, method="inclusive")
+    return {"median_ns": median, "iqr_ns": q3 - q1, "rounds": len(samples)}
+
+
+def run_benchmarks(cases, rounds, min_time):
+    """Run every case with output discarded; returns ({name: summary}, [failed names])"""
+    results = {}
+    failed = []
+    with open(os.devnull, "w") as devnull:
+        for name, fn in cases:
+            try:
+                with contextlib.redirect_stdout(devnull):
+                    samples = time_case(fn, rounds, min_time)
+            except RuntimeError as e:
+                failed.append(name)
+                print(f"{name:<30} ✗ failed: {e}")
+                continue
+            results[name] = summarize(samples)
+            stats = results[name]
+            print(f"{name:<30} {stats['median_ns']:>10.0f} ns  ± {stats['iqr_ns']:>7.0f} (IQR)")
+    return results, failed
+
+
+def compare(results, baseline, threshold):
+    """
+    Print changes against a baseline and return the names that regressed
+
+    Args:
+        results: Current {name: summary}
+        baseline: Baseline {name: summary}
+        threshold: Allowed slowdown in percent
+    """
+    regressions = []
+    print(f"\n{'case':<30} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<30} {'-':>10} {stats['median_ns']:>10.0f} {'new':>8}")
+            continue
+        change = (stats["median_ns"] - base["median_ns"]) / base["median_ns"] * 100
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  ✗ regression"
+        print(f"{name:<30} {base['median_ns']:>10.0f} {stats['median_ns']:>10.0f} {change:>+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MQTT client microbenchmarks')
+    parser.add_argument('--rounds', type=int, default=15, help='Timed rounds per case (default: 15)')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='Minimum seconds per round (default: 0.05)')
+    parser.add_argument('--filter', help='Only run cases whose name contains this text')
+    parser.add_argument('--no-network', action='store_true', help='Skip the publish cases (no null broker)')
+    parser.add_argument('--ack-window', type=int, default=20,
+                        help='QoS 1 messages published before waiting for their PUBACKs (default: 20)')
+    parser.add_argument('--save', help='Save results as a baseline JSON file')
+    parser.add_argument('--compare', help='Compare against a baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Slowdown in percent that counts as a regression (default: 10)')
+
+    args = parser.parse_args()
+
+    null_broker = None
+    port = None
+    if not args.no_network:
+        null_broker = NullBroker()
+        port = null_broker.start()
+
+    cases, clients = build_cases(port, args.ack_window)
+    if args.filter:
+        cases = [(name, fn) for name, fn in cases if args.filter in name]
+
+    print(f"Python {platform.python_version()}, JSON backend {JSON_BACKEND}, "
+          f"{args.rounds} rounds of >= {args.min_time}s\n")
+    try:
+        results, failed = run_benchmarks(cases, args.rounds, args.min_time)
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for client in clients:
+                client.disconnect()
+        if null_broker:
+            null_broker.stop()
+
+    if failed:
+        # A baseline or comparison missing cases would hide the failure
+        print(f"\n✗ {len(failed)} case(s) failed: {', '.join(failed)}")
+        sys.exit(1)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "json_backend": JSON_BACKEND,
+                       "results": results}, f, indent=2)
+        print(f"\n✓ Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} case(s) slower than {args.threshold}%: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n✓ No regressions above {args.threshold}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+MQTT Sensor Payload Templates
+Builds simulated sensor messages without a dict, f-strings, isoformat() or
+json.dumps per message: each sensor's topic and the static JSON fragments are
+prepared once, the timestamp text is cached per second, and only the
+numeric fields are formatted into a reused bytearray, copied out once as the
+payload.
+
+The output is the same JSON document the simulators publish (same keys,
+order and separators); numbers are written with fixed decimals.
+
+Usage:
+    python3 mqtt_sensor_simulator.py --sensors 1000 --interval 1 --template
+    python3 mqtt_render_pubsub.py --mode sensor --host ... --port ... --sensors 1000 --template
+
+    # Compare time and allocation pressure per message with the dict + json.dumps path
+    python3 mqtt_payload_template.py --messages 100000
+"""
+
+import gc
+import json
+import math
+import time
+import random
+import argparse
+
+
+def sensor_values(sequence):
+    """Simulated (temperature, humidity, pressure, battery), unrounded (shared by every simulator path)"""
+    return (22.0 + random.uniform(-2, 2) + 0.1 * math.sin(sequence / 10),
+            50.0 + random.uniform(-5, 5) + 0.1 * math.cos(sequence / 15),
+            1013.25 + random.uniform(-2, 2),
+            random.uniform(60, 100))
+
+
+class SensorPayloadTemplate:
+    """Precomputed per-sensor topics and payload fragments"""
+
+    BODY = b'.%06d", "sequence": %d, "temperature": %.2f, "humidity": %.2f, "pressure": %.2f, "battery": %.1f}'
+
+    def __init__(self, topic_base="sensors"):
+        """
+        Initialize payload template
+
+        Args:
+            topic_base: Base topic for sensors
+        """
+        self.topic_base = topic_base
+        self.slots = {}     # sensor id -> slot
+        self.topics = []    # slot -> topic (paho takes str topics)
+        self.prefixes = []  # slot -> b'{"sensor_id": "...", "timestamp": "'
+        self.buffer = bytearray()
+        self.second = None
+        self.stamp = b""
+
+    def slot(self, sensor_id):
+        """Return the slot for a sensor, preparing its fragments on first use"""
+        slot = self.slots.get(sensor_id)
+        if slot is None:
+            slot = self.slots[sensor_id] = len(self.topics)
+            self.topics.append(f"{self.topic_base}/{sensor_id}/data")
+            self.prefixes.append(b'{"sensor_id": ' + json.dumps(sensor_id).encode("utf-8") + b', "timestamp": "')
+        return slot
+
+    def render(self, slot, sequence, temperature, humidity, pressure, battery, now=None):
+        """
+        Render one reading and return it as a new bytes payload
+
+        The reading is assembled in a reused bytearray and copied out once.
+        The copy is required: paho keeps a reference to the payload of
+        queued QoS>0 messages (beyond max_inflight, and for retransmits), so
+        publishing the shared buffer itself would send later readings.
+
+        Args:
+            slot: Sensor slot from slot()
+            sequence: Message sequence number
+            temperature, humidity, pressure, battery: Field values
+            now: Unix time for the timestamp (defaults to time.time())
+        """
+        if now is None:
+            now = time.time()
+        second = int(now)
+        if second != self.second:
+            # Local time, like datetime.now().isoformat()
+            self.second = second
+            self.stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second)).encode("ascii")
+
+        buffer = self.buffer
+        del buffer[:]
+        buffer += self.prefixes[slot]
+        buffer += self.stamp
+        buffer += self.BODY % (int((now - second) * 1000000), sequence, temperature, humidity, pressure, battery)
+        return bytes(buffer)
+
+
+def bench_dict_path(messages, sensor_ids, topic_base):
+    from mqtt_render_pubsub import generate_sensor_reading
+    for sequence in range(1, messages + 1):
+        sensor_id = sensor_ids[sequence % len(sensor_ids)]
+        topic = f"{topic_base}/{sensor_id}/data"
+        payload = json.dumps(generate_sensor_reading(sensor_id, sequence))
+
+
+def bench_template_path(messages, sensor_ids, topic_base):
+    template = SensorPayloadTemplate(topic_base)
+    slots = [template.slot(sensor_id) for sensor_id in sensor_ids]
+    for sequence in range(1, messages + 1):
+        slot = slots[sequence % len(slots)]
+        topic = template.topics[slot]
+        payload = template.render(slot, sequence, *sensor_values(sequence))
+
+
+def measure(fn, *args):
+    """Return (seconds, gen0 garbage collections) for one run; the latter tracks container allocations"""
+    collections = gc.get_stats()[0]["collections"]
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    return elapsed, gc.get_stats()[0]["collections"] - collections
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare templated and dict/json.dumps sensor payloads')
+    parser.add_argument('--messages', type=int, default=100000, help='Messages per path (default: 100000)')
+    parser.add_argument('--sensors', type=int, default=1000, help='Number of sensors (default: 1000)')
+    parser.add_argument('--topic-base', default='sensors', help='Base topic for sensors (default: sensors)')
+
+    args = parser.parse_args()
+    sensor_ids = [f"sensor_{i:03d}" for i in range(1, args.sensors + 1)]
+
+    print(f"{args.messages} messages over {args.sensors} sensors\n")
+    for name, fn in (("dict + json.dumps", bench_dict_path), ("template", bench_template_path)):
+        elapsed, collections = measure(fn, args.messages, sensor_ids, args.topic_base)
+        print(f"{name:<18} {elapsed / args.messages * 1e9:8.0f} ns/msg  "
+              f"{args.messages / elapsed:10.0f} msg/s  {collections:6d} gen0 collections")
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,15 @@ Usage:
     
     # Interactive pub/sub
     python3 mqtt_render_pubsub.py --mode interactive --host mqtt-xxxxx.render.com --port 12345
+    
+    # Simulate sensors via the lowest-latency of several brokers (or --fanout mirror)
+    python3 mqtt_render_pubsub.py --mode sensor --host mqtt-xxxxx.render.com --port 12345 --brokers mqtt.example.eu:1883
+    
+    # Serve roller-door commands (device side)
+    python3 mqtt_render_pubsub.py --mode responder --host mqtt-xxxxx.render.com --port 12345 --doors 200
+    
+    # Open 200 doors concurrently
+    python3 mqtt_render_pubsub.py --mode call --host mqtt-xxxxx.render.com --port 12345 --doors 200 --command open
 """
 
 import paho.mqtt.client as mqtt
@@ -26,8 +35,11 @@ import json
 import argparse
 import sys
 from datetime import datetime
-import random
-import math
+import itertools
+import threading
+
+from mqtt_decoder import PayloadDecoder, plain, KIND_SENSOR, KIND_JSON, KIND_TEXT
+from mqtt_payload_template import sensor_values
 
 # Handle different versions of paho-mqtt
 try:
@@ -37,6 +49,75 @@ except ImportError:
     MQTT_CALLBACK_API = None
 
 
+# RPC topics: commands go to a device, replies come back on a per-client topic
+RPC_COMMAND_TOPIC = "doors/{device}/cmd"
+RPC_RESPONSE_TOPIC = "rpc/{client_id}/response"
+
+
+class RPCStats:
+    """Round-trip latency histogram and counters for RPC calls"""
+    
+    BUCKETS = 16  # power-of-two millisecond buckets: <1, <2, <4, ... ms
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histogram = [0] * self.BUCKETS
+        self.calls = 0
+        self.replies = 0
+        self.timeouts = 0
+        self.unmatched = 0
+    
+    def record(self, latency):
+        """Record one reply latency in seconds"""
+        bucket = min(int(latency * 1000).bit_length(), self.BUCKETS - 1)
+        with self.lock:
+            self.histogram[bucket] += 1
+            self.replies += 1
+    
+    def count(self, name):
+        """Increment a counter (calls, timeouts, unmatched)"""
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+    
+    def percentile(self, fraction):
+        """Upper bound (ms) of the bucket containing the given percentile"""
+        target = fraction * self.replies
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                return 1 << bucket
+        return 0
+    
+    def report(self):
+        """Print counters and the latency histogram"""
+        print(f"RPC calls: {self.calls}, replies: {self.replies}, "
+              f"timeouts: {self.timeouts}, unmatched replies: {self.unmatched}")
+        if not self.replies:
+            return
+        print(f"Latency p50 <{self.percentile(0.5)}ms, p95 <{self.percentile(0.95)}ms, "
+              f"p99 <{self.percentile(0.99)}ms")
+        peak = max(self.histogram)
+        for bucket, count in enumerate(self.histogram):
+            if count:
+                bar = "#" * max(1, count * 40 // peak)
+                print(f"  <{1 << bucket:>6}ms {count:>7} {bar}")
+
+
+class PendingCall:
+    """An outstanding RPC call awaiting its reply"""
+    
+    __slots__ = ("correlation_id", "device", "command", "sent_at", "event", "response")
+    
+    def __init__(self, correlation_id, device, command):
+        self.correlation_id = correlation_id
+        self.device = device
+        self.command = command
+        self.sent_at = time.perf_counter()
+        self.event = threading.Event()
+        self.response = None
+
+
 class MQTTRenderBroker:
     """Complete MQTT Pub/Sub client for Render.com broker"""
     
@@ -59,12 +140,23 @@ class MQTTRenderBroker:
         self.client = None
         self.connected = False
         self.message_count = 0
+        self.decoder = PayloadDecoder()
+        
+        # RPC state: one table of outstanding calls keyed by correlation id
+        self.response_topic = RPC_RESPONSE_TOPIC.format(client_id=self.client_id)
+        self.pending_calls = {}
+        self.call_ids = itertools.count(1)
+        self.rpc_ready = False
+        self.rpc_stats = RPCStats()
         
     def on_connect(self, client, userdata, flags, rc):
         """Callback when client connects"""
         if rc == 0:
             print(f"✓ Connected to {self.host}:{self.port}")
             self.connected = True
+            if self.rpc_ready:
+                # Clean sessions drop subscriptions; restore the reply topic
+                client.subscribe(self.response_topic, qos=1)
         else:
             print(f"✗ Connection failed with code {rc}")
             self.connected = False
@@ -91,37 +183,40 @@ class MQTTRenderBroker:
         self.message_count += 1
         timestamp = datetime.now().strftime("%H:%M:%S")
         
-        # Try to parse as JSON
-        try:
-            payload = msg.payload.decode('utf-8')
-            data = json.loads(payload)
-            print(f"[{timestamp}] Message #{self.message_count} from '{msg.topic}':")
+        # Payload kind is learned per topic, so this is a single decode attempt
+        kind, data = self.decoder.decode(msg.topic, msg.payload)
+        print(f"[{timestamp}] Message #{self.message_count} from '{msg.topic}':")
+        if kind is KIND_SENSOR:
+            print(json.dumps(plain(data), indent=2))
+        elif kind is KIND_JSON:
             print(json.dumps(data, indent=2))
-        except (json.JSONDecodeError, UnicodeDecodeError):
-            # Just print as string
-            try:
-                print(f"[{timestamp}] Message #{self.message_count} from '{msg.topic}':")
-                print(msg.payload.decode('utf-8'))
-            except:
-                print(f"[{timestamp}] Message #{self.message_count} from '{msg.topic}':")
-                print(f"[Binary data: {msg.payload.hex()}]")
+        elif kind is KIND_TEXT:
+            print(data)
+        else:
+            # Preview only: hex() of a multi-megabyte blob doubles it in memory
+            preview = msg.payload[:32].hex()
+            print(f"[Binary data: {len(msg.payload)} bytes, {preview}{'...' if len(msg.payload) > 32 else ''}]")
         
         print("-" * 60)
     
+    def _create_client(self):
+        """Create the paho client and attach callbacks"""
+        if MQTT_CALLBACK_API is not None:
+            self.client = mqtt.Client(MQTT_CALLBACK_API, self.client_id)
+        else:
+            self.client = mqtt.Client(self.client_id)
+        
+        self.client.username_pw_set(self.username, self.password)
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_publish = self.on_publish
+        self.client.on_subscribe = self.on_subscribe
+        self.client.on_message = self.on_message
+    
     def connect(self):
         """Connect to MQTT broker"""
         try:
-            if MQTT_CALLBACK_API is not None:
-                self.client = mqtt.Client(MQTT_CALLBACK_API, self.client_id)
-            else:
-                self.client = mqtt.Client(self.client_id)
-            
-            self.client.username_pw_set(self.username, self.password)
-            self.client.on_connect = self.on_connect
-            self.client.on_disconnect = self.on_disconnect
-            self.client.on_publish = self.on_publish
-            self.client.on_subscribe = self.on_subscribe
-            self.client.on_message = self.on_message
+            self._create_client()
             
             print(f"Connecting to {self.host}:{self.port}...")
             self.client.connect(self.host, self.port, keepalive=60)
@@ -142,7 +237,29 @@ class MQTTRenderBroker:
             print(f"✗ Connection error: {e}")
             return False
     
-    def publish(self, topic, message, qos=1, retain=False):
+    def connect_async(self, reconnect_delay=0.5):
+        """
+        Start connecting in the background without waiting
+        
+        The network thread performs the TCP connect and keeps retrying
+        with a short backoff, so an unreachable broker never blocks the
+        caller. Check self.connected for the current state.
+        
+        Args:
+            reconnect_delay: Maximum seconds between reconnect attempts
+        """
+        try:
+            self._create_client()
+            self.client.reconnect_delay_set(min_delay=min(0.1, reconnect_delay), max_delay=reconnect_delay)
+            print(f"Connecting to {self.host}:{self.port} (background)...")
+            self.client.connect_async(self.host, self.port, keepalive=60)
+            self.client.loop_start()
+            return True
+        except Exception as e:
+            print(f"✗ Connection error: {e}")
+            return False
+    
+    def publish(self, topic, message, qos=1, retain=False, quiet=False):
         """
         Publish message
         
@@ -151,6 +268,7 @@ class MQTTRenderBroker:
             message: Message payload
             qos: Quality of Service (0, 1, or 2)
             retain: Retain message
+            quiet: Do not print successful publishes
         """
         try:
             if not self.connected:
@@ -159,7 +277,8 @@ class MQTTRenderBroker:
             
             result = self.client.publish(topic, message, qos=qos, retain=retain)
             if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                print(f"✓ Published to '{topic}': {message}")
+                if not quiet:
+                    print(f"✓ Published to '{topic}': {message}")
                 return True
             else:
                 print(f"✗ Publish failed: {result.rc}")
@@ -169,7 +288,7 @@ class MQTTRenderBroker:
             print(f"✗ Publish error: {e}")
             return False
     
-    def publish_json(self, topic, data, qos=1, retain=False):
+    def publish_json(self, topic, data, qos=1, retain=False, quiet=False):
         """
         Publish JSON message
         
@@ -178,10 +297,11 @@ class MQTTRenderBroker:
             data: Dictionary to serialize as JSON
             qos: Quality of Service
             retain: Retain message
+            quiet: Do not print successful publishes
         """
         try:
             message = json.dumps(data)
-            return self.publish(topic, message, qos=qos, retain=retain)
+            return self.publish(topic, message, qos=qos, retain=retain, quiet=quiet)
         except Exception as e:
             print(f"✗ JSON publish error: {e}")
             return False
@@ -211,6 +331,113 @@ class MQTTRenderBroker:
             print(f"✗ Subscribe error: {e}")
             return False
     
+    def _ensure_rpc(self):
+        """Subscribe to this client's RPC reply topic on first use"""
+        if self.rpc_ready:
+            return
+        self.client.message_callback_add(self.response_topic, self.on_rpc_response)
+        self.client.subscribe(self.response_topic, qos=1)
+        self.rpc_ready = True
+    
+    def on_rpc_response(self, client, userdata, msg):
+        """Callback for replies on the RPC response topic"""
+        try:
+            reply = json.loads(msg.payload)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            reply = None
+        # Our correlation ids are strings; a list or dict id cannot even be looked up
+        if not isinstance(reply, dict) or not isinstance(reply.get("id"), str):
+            self.rpc_stats.count("unmatched")
+            return
+        pending = self.pending_calls.pop(reply["id"], None)
+        if pending is None:
+            # Late reply to a call that already timed out
+            self.rpc_stats.count("unmatched")
+            return
+        self.rpc_stats.record(time.perf_counter() - pending.sent_at)
+        pending.response = reply
+        pending.event.set()
+    
+    def call_async(self, device, command, params=None, qos=1):
+        """
+        Send an RPC command without waiting for the reply
+        
+        Args:
+            device: Target device id
+            command: Command name (e.g. open, close, stop, status)
+            params: Optional command parameters
+            qos: Quality of Service
+        
+        Returns:
+            PendingCall to pass to wait(), or None if the publish failed
+        """
+        if not self.connected:
+            print("✗ Not connected to broker")
+            return None
+        self._ensure_rpc()
+        
+        correlation_id = f"{self.client_id}-{next(self.call_ids)}"
+        pending = PendingCall(correlation_id, device, command)
+        self.pending_calls[correlation_id] = pending
+        self.rpc_stats.count("calls")
+        
+        request = {"id": correlation_id, "command": command, "reply_to": self.response_topic}
+        if params:
+            request["params"] = params
+        if not self.publish_json(RPC_COMMAND_TOPIC.format(device=device), request, qos=qos, quiet=True):
+            self.pending_calls.pop(correlation_id, None)
+            return None
+        return pending
+    
+    def wait(self, pending, timeout=5.0):
+        """
+        Wait for a call's reply
+        
+        Returns:
+            Reply dictionary, or None on timeout
+        """
+        if pending is None:
+            return None
+        if pending.event.wait(timeout):
+            return pending.response
+        if self.pending_calls.pop(pending.correlation_id, None) is None:
+            # The reply thread popped the call between the timeout and our pop
+            # and is about to set the response; give it a moment to finish
+            pending.event.wait(1.0)
+            return pending.response
+        self.rpc_stats.count("timeouts")
+        return None
+    
+    def call(self, device, command, params=None, timeout=5.0):
+        """
+        Send an RPC command and wait for its reply
+        
+        Args:
+            device: Target device id
+            command: Command name
+            params: Optional command parameters
+            timeout: Seconds to wait for the reply
+        
+        Returns:
+            Reply dictionary, or None on timeout
+        """
+        return self.wait(self.call_async(device, command, params), timeout)
+    
+    def call_many(self, devices, command, params=None, timeout=5.0):
+        """
+        Send one command to many devices concurrently
+        
+        All requests are published before any reply is awaited, so the total
+        time is one round trip rather than one per device.
+        
+        Returns:
+            Dictionary of device -> reply (None for timeouts)
+        """
+        calls = [(device, self.call_async(device, command, params)) for device in devices]
+        deadline = time.monotonic() + timeout
+        return {device: self.wait(pending, max(0.0, deadline - time.monotonic()))
+                for device, pending in calls}
+    
     def disconnect(self):
         """Disconnect from broker"""
         if self.client:
@@ -219,9 +446,360 @@ class MQTTRenderBroker:
             print("Disconnected from broker")
 
 
+class BrokerLink(MQTTRenderBroker):
+    """One member connection of a MultiBrokerClient with round-trip tracking"""
+    
+    def __init__(self, host, port, username, password, client_id):
+        super().__init__(host, port, username, password, client_id)
+        # Per link, so brokers that bridge each other cannot answer another link's ping
+        self.ping_topic = f"_ping/{self.client_id}"
+        self.rtt = None
+        self.last_pong = 0.0
+    
+    def on_connect(self, client, userdata, flags, rc):
+        """Callback when client connects: (re)subscribe to the ping topic"""
+        super().on_connect(client, userdata, flags, rc)
+        if rc == 0:
+            client.message_callback_add(self.ping_topic, self.on_pong)
+            client.subscribe(self.ping_topic, qos=0)
+    
+    def ping(self):
+        """Publish a timestamped ping to this broker"""
+        self.client.publish(self.ping_topic, repr(time.perf_counter()), qos=0)
+    
+    def on_pong(self, client, userdata, msg):
+        """Callback for our own ping coming back: update the RTT estimate"""
+        try:
+            rtt = time.perf_counter() - float(msg.payload)
+        except ValueError:
+            return
+        self.rtt = rtt if self.rtt is None else 0.8 * self.rtt + 0.2 * rtt
+        self.last_pong = time.monotonic()
+    
+    def describe(self):
+        rtt = f"{self.rtt * 1000:.1f}ms" if self.rtt is not None else "n/a"
+        state = "connected" if self.connected else "down"
+        return f"{self.host}:{self.port} {state}, rtt {rtt}"
+
+
+class MultiBrokerClient:
+    """Publishes through several brokers: to the fastest healthy one, or to all"""
+    
+    def __init__(self, endpoints, username="admin", password="password", mode="fastest",
+                 ping_interval=0.25, client_id=None):
+        """
+        Initialize multi-broker client
+        
+        Args:
+            endpoints: List of (host, port) tuples
+            username: MQTT username
+            password: MQTT password
+            mode: "fastest" (lowest-RTT healthy broker) or "mirror" (every connected broker)
+            ping_interval: Seconds between RTT pings; a broker that misses three
+                           pings in a row is skipped until it answers again
+            client_id: Unique client identifier; each link connects as <client_id>-<index>
+        """
+        self.client_id = client_id or f"python-multi-{int(time.time())}"
+        self.mode = mode
+        self.ping_interval = ping_interval
+        self.links = [BrokerLink(host, port, username, password, f"{self.client_id}-{index}")
+                      for index, (host, port) in enumerate(endpoints)]
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.failovers = 0
+        self.current = None
+    
+    def healthy_links(self):
+        """Connected links that answered a ping recently, fastest first"""
+        cutoff = time.monotonic() - 3 * self.ping_interval
+        links = [link for link in self.links
+                 if link.connected and link.rtt is not None and link.last_pong >= cutoff]
+        return sorted(links, key=lambda link: link.rtt)
+    
+    @property
+    def connected(self):
+        return any(link.connected for link in self.links)
+    
+    def connect(self, timeout=5):
+        """
+        Connect to every broker in the background and wait for the first healthy one
+        
+        Returns:
+            True if at least one broker is connected
+        """
+        for link in self.links:
+            link.connect_async()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._ping_loop, name="broker-ping", daemon=True)
+        self.thread.start()
+        
+        start = time.time()
+        while not self.healthy_links() and (time.time() - start) < timeout:
+            time.sleep(0.05)
+        
+        if not self.connected:
+            print("✗ No broker reachable")
+            return False
+        return True
+    
+    def _ping_loop(self):
+        while not self.stop_event.wait(self.ping_interval):
+            for link in self.links:
+                if link.connected:
+                    link.ping()
+    
+    def publish(self, topic, message, qos=1, retain=False, quiet=False):
+        """
+        Publish through the fastest healthy broker, or every broker in mirror mode
+        
+        Falls back to any connected broker when none has answered a ping yet.
+        """
+        if self.mode == "mirror":
+            links = [link for link in self.links if link.connected]
+            results = [link.publish(topic, message, qos=qos, retain=retain, quiet=quiet) for link in links]
+            return any(results)
+        
+        candidates = self.healthy_links() or [link for link in self.links if link.connected]
+        for link in candidates:
+            if link.publish(topic, message, qos=qos, retain=retain, quiet=quiet):
+                if link is not self.current:
+                    if self.current is not None:
+                        self.failovers += 1
+                        print(f"↪ Switched to {link.host}:{link.port}")
+                    self.current = link
+                return True
+        print("✗ No broker available")
+        return False
+    
+    def publish_json(self, topic, data, qos=1, retain=False, quiet=False):
+        """Publish a dictionary as JSON (see publish())"""
+        return self.publish(topic, json.dumps(data), qos=qos, retain=retain, quiet=quiet)
+    
+    def report(self):
+        """Print per-broker state and RTT"""
+        print(f"Brokers ({self.mode}), switches: {self.failovers}")
+        for link in self.links:
+            marker = "*" if link is self.current else " "
+            print(f" {marker} {link.describe()}")
+    
+    def disconnect(self):
+        """Stop pinging and disconnect from every broker"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        for link in self.links:
+            link.disconnect()
+
+
+class RPCResponder:
+    """Device-side helper that serves RPC commands and publishes replies"""
+    
+    def __init__(self, broker, devices, handler):
+        """
+        Initialize RPC responder
+        
+        Args:
+            broker: Connected MQTTRenderBroker
+            devices: Device ids to serve
+            handler: Callable(device, command, params) returning a result;
+                     exceptions are returned to the caller as errors
+        """
+        self.broker = broker
+        self.devices = set(devices)
+        self.handler = handler
+        self.served = 0
+    
+    def start(self):
+        """Subscribe to the command topics of the served devices"""
+        # One wildcard subscription instead of one per device for larger fleets
+        if len(self.devices) == 1:
+            topic = RPC_COMMAND_TOPIC.format(device=next(iter(self.devices)))
+        else:
+            topic = RPC_COMMAND_TOPIC.format(device="+")
+        self.broker.client.message_callback_add(topic, self.on_command)
+        self.broker.subscribe(topic, qos=1)
+        print(f"✓ Serving RPC commands for {len(self.devices)} device(s)")
+    
+    def on_command(self, client, userdata, msg):
+        """Callback for a command: run the handler and reply to reply_to"""
+        try:
+            request = json.loads(msg.payload)
+            correlation_id = request["id"]
+            reply_to = request["reply_to"]
+        except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError):
+            print(f"✗ Malformed RPC request on '{msg.topic}'")
+            return
+        
+        device = msg.topic.split("/")[1]
+        if device not in self.devices:
+            return
+        try:
+            reply = {"id": correlation_id, "ok": True,
+                     "result": self.handler(device, request.get("command"), request.get("params"))}
+        except Exception as e:
+            reply = {"id": correlation_id, "ok": False, "error": str(e)}
+        self.served += 1
+        self.broker.publish_json(reply_to, reply, qos=1, quiet=True)
+
+
+class RollerDoorSimulator:
+    """RPC handler that simulates roller-door state"""
+    
+    COMMANDS = {"open": "open", "close": "closed", "stop": "stopped"}
+    
+    def __init__(self):
+        self.states = {}
+    
+    def __call__(self, device, command, params):
+        if command == "status":
+            return {"state": self.states.get(device, "closed")}
+        if command not in self.COMMANDS:
+            raise ValueError(f"Unknown command '{command}'")
+        self.states[device] = self.COMMANDS[command]
+        return {"state": self.states[device]}
+
+
+def generate_sensor_reading(sensor_id, sequence):
+    """
+    Generate one realistic sensor reading
+    
+    Args:
+        sensor_id: Sensor identifier
+        sequence: Message sequence number
+    """
+    temperature, humidity, pressure, battery = sensor_values(sequence)
+    
+    return {
+        "sensor_id": sensor_id,
+        "timestamp": datetime.now().isoformat(),
+        "sequence": sequence,
+        "temperature": round(temperature, 2),
+        "humidity": round(humidity, 2),
+        "pressure": round(pressure, 2),
+        "battery": round(battery, 1)
+    }
+
+
+class SensorFleet:
+    """Background sensor generator that can be reshaped while it runs"""
+    
+    TICK = 0.01  # seconds between pacing checks
+    
+    def __init__(self, broker, sensors, interval, topic_base="sensors"):
+        """
+        Initialize sensor fleet
+        
+        Args:
+            broker: Connected MQTTRenderBroker
+            sensors: Number of sensors
+            interval: Seconds between readings from each sensor
+            topic_base: Base topic for sensors
+        """
+        self.broker = broker
+        self.sensors = sensors
+        self.interval = interval
+        self.topic_base = topic_base
+        self.paused = False
+        self.sequence = 0
+        self.published = 0
+        self.failed = 0
+        self.rate = 0.0
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+    
+    @property
+    def offered_rate(self):
+        """Target messages per second"""
+        return self.sensors / self.interval
+    
+    def start(self):
+        """Start publishing in a background thread"""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="sensor-fleet", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Stop the background thread"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+    
+    def _run(self):
+        """
+        Publish at sensors/interval messages per second
+        
+        Readings are spread evenly over the interval using a credit counter,
+        so scale and rate changes take effect on the next tick and the load
+        arrives smoothly instead of in one burst per round.
+        """
+        credit = 0.0
+        index = 0
+        last = rate_mark = time.perf_counter()
+        rate_count = self.published
+        
+        while not self.stop_event.is_set():
+            now = time.perf_counter()
+            if not self.paused:
+                # Never owe more than one round or 100 ms of messages, whichever is
+                # larger (e.g. after a stall); a cap of one round alone would hold
+                # fast fleets to one round per tick
+                offered = self.offered_rate
+                credit = min(credit + (now - last) * offered, max(float(self.sensors), offered * 0.1))
+            last = now
+            
+            while credit >= 1:
+                credit -= 1
+                index = index % self.sensors + 1
+                self.sequence += 1
+                sensor_id = f"sensor_{index:03d}"
+                topic = f"{self.topic_base}/{sensor_id}/data"
+                if self.broker.publish_json(topic, generate_sensor_reading(sensor_id, self.sequence), quiet=True):
+                    self.published += 1
+                else:
+                    self.failed += 1
+            
+            if now - rate_mark >= 1.0:
+                self.rate = (self.published - rate_count) / (now - rate_mark)
+                rate_mark, rate_count = now, self.published
+            
+            self.stop_event.wait(self.TICK)
+    
+    def status(self):
+        """Return a one-line status summary"""
+        state = "paused" if self.paused else ("running" if self.running else "stopped")
+        return (f"Fleet {state}: {self.sensors} sensors every {self.interval}s "
+                f"(offered {self.offered_rate:.0f} msg/s, actual {self.rate:.0f} msg/s), "
+                f"published {self.published}, failed {self.failed}")
+
+
+def parse_endpoints(spec):
+    """Parse "host:port,host:port" into a list of (host, port) tuples"""
+    endpoints = []
+    for item in spec.split(","):
+        host, _, port = item.strip().rpartition(":")
+        if not host:
+            raise ValueError(f"Invalid broker '{item}' (expected host:port)")
+        endpoints.append((host, int(port)))
+    return endpoints
+
+
+def create_publisher(args):
+    """MultiBrokerClient when --brokers is given, otherwise a single MQTTRenderBroker"""
+    if args.brokers:
+        endpoints = [(args.host, args.port)] + parse_endpoints(args.brokers)
+        return MultiBrokerClient(endpoints, args.username, args.password, mode=args.fanout)
+    return MQTTRenderBroker(args.host, args.port, args.username, args.password)
+
+
 def mode_publish(args):
     """Publish messages"""
-    broker = MQTTRenderBroker(args.host, args.port, args.username, args.password)
+    broker = create_publisher(args)
     
     if not broker.connect():
         return False
@@ -264,44 +842,53 @@ def mode_subscribe(args):
 
 def mode_sensor(args):
     """Simulate sensor publishing"""
-    broker = MQTTRenderBroker(args.host, args.port, args.username, args.password)
+    broker = create_publisher(args)
     
     if not broker.connect():
         return False
     
+    from mqtt_deadband import create_filter
+    deadband = create_filter(args)
+    
     try:
         print(f"\n=== Simulating {args.sensors} sensors ===")
         print(f"Interval: {args.interval} seconds")
         if args.duration:
             print(f"Duration: {args.duration} seconds")
+        if deadband:
+            print(f"Deadband filtering enabled (heartbeat {args.heartbeat}s)")
         print("Press Ctrl+C to stop\n")
         
         start_time = time.time()
         sequence = 0
+        sensor_ids = [f"sensor_{i:03d}" for i in range(1, args.sensors + 1)]
+        
+        template = None
+        if args.template:
+            from mqtt_payload_template import SensorPayloadTemplate, sensor_values
+            template = SensorPayloadTemplate("sensors")
+            print("Using precompiled payload templates (per-message output disabled)")
         
         while True:
             # Publish from each sensor
-            for i in range(1, args.sensors + 1):
+            for sensor_id in sensor_ids:
                 sequence += 1
-                sensor_id = f"sensor_{i:03d}"
                 
-                # Generate realistic sensor data
-                base_temp = 22.0
-                base_humidity = 50.0
+                if template is not None:
+                    temperature, humidity, pressure, battery = sensor_values(sequence)
+                    if deadband and not deadband.should_send(
+                            sensor_id, {"temperature": temperature, "humidity": humidity,
+                                        "pressure": pressure, "battery": battery}):
+                        continue
+                    slot = template.slot(sensor_id)
+                    payload = template.render(slot, sequence, temperature, humidity, pressure, battery)
+                    broker.publish(template.topics[slot], payload, quiet=True)
+                    continue
                 
-                temperature = base_temp + random.uniform(-2, 2) + 0.1 * math.sin(sequence / 10)
-                humidity = base_humidity + random.uniform(-5, 5) + 0.1 * math.cos(sequence / 15)
-                pressure = 1013.25 + random.uniform(-2, 2)
+                sensor_data = generate_sensor_reading(sensor_id, sequence)
                 
-                sensor_data = {
-                    "sensor_id": sensor_id,
-                    "timestamp": datetime.now().isoformat(),
-                    "sequence": sequence,
-                    "temperature": round(temperature, 2),
-                    "humidity": round(humidity, 2),
-                    "pressure": round(pressure, 2),
-                    "battery": round(random.uniform(60, 100), 1)
-                }
+                if deadband and not deadband.should_send(sensor_id, sensor_data):
+                    continue
                 
                 topic = f"sensors/{sensor_id}/data"
                 broker.publish_json(topic, sensor_data)
@@ -317,6 +904,10 @@ def mode_sensor(args):
     except KeyboardInterrupt:
         print("\n\nInterrupted by user")
     finally:
+        if deadband:
+            print(deadband.report())
+        if isinstance(broker, MultiBrokerClient):
+            broker.report()
         broker.disconnect()
     
     return True
@@ -329,12 +920,20 @@ def mode_interactive(args):
     if not broker.connect():
         return False
     
+    fleet = None
+    
     try:
         print("\n=== MQTT Interactive Mode ===")
         print("Commands:")
         print("  pub <topic> <message> - Publish a message")
         print("  sub <topic>           - Subscribe to a topic")
-        print("  sensor <n> <interval> - Simulate n sensors")
+        print("  sensor <n> <interval> - Simulate n sensors in the background")
+        print("  fleet                 - Show fleet status and throughput")
+        print("  fleet scale <n>       - Change the number of sensors")
+        print("  fleet rate <interval> - Change the interval per sensor (seconds)")
+        print("  fleet pause|resume    - Pause or resume publishing")
+        print("  fleet watch <seconds> - Print throughput every second")
+        print("  fleet stop            - Stop the fleet")
         print("  exit                  - Quit")
         print()
         
@@ -369,9 +968,50 @@ def mode_interactive(args):
                         print("Usage: sensor <num_sensors> <interval_seconds>")
                         continue
                     num_sensors = int(cmd[1])
-                    interval = int(cmd[2])
-                    print(f"Publishing from {num_sensors} sensors every {interval}s...")
-                    # Could implement this here
+                    interval = float(cmd[2])
+                    if num_sensors < 1 or interval <= 0:
+                        print("Sensors must be >= 1 and interval > 0")
+                        continue
+                    if fleet is None or not fleet.running:
+                        fleet = SensorFleet(broker, num_sensors, interval)
+                        fleet.start()
+                    else:
+                        fleet.sensors = num_sensors
+                        fleet.interval = interval
+                    print(f"Publishing from {num_sensors} sensors every {interval}s in the background")
+                
+                elif cmd[0].lower() == "fleet":
+                    action = cmd[1].lower() if len(cmd) > 1 else "status"
+                    if fleet is None:
+                        print("No fleet running (start one with: sensor <n> <interval>)")
+                    elif action == "status":
+                        print(fleet.status())
+                    elif action == "scale" and len(cmd) > 2 and int(cmd[2]) >= 1:
+                        fleet.sensors = int(cmd[2])
+                        print(fleet.status())
+                    elif action == "rate" and len(cmd) > 2 and float(cmd[2]) > 0:
+                        fleet.interval = float(cmd[2])
+                        print(fleet.status())
+                    elif action == "pause":
+                        fleet.paused = True
+                        print(fleet.status())
+                    elif action == "resume":
+                        fleet.paused = False
+                        print(fleet.status())
+                    elif action == "watch":
+                        seconds = int(cmd[2]) if len(cmd) > 2 else 10
+                        try:
+                            for _ in range(seconds):
+                                time.sleep(1)
+                                print(fleet.status())
+                        except KeyboardInterrupt:
+                            pass
+                    elif action == "stop":
+                        fleet.stop()
+                        print(fleet.status())
+                        fleet = None
+                    else:
+                        print("Usage: fleet [status|scale <n>|rate <interval>|pause|resume|watch <seconds>|stop]")
                 
                 else:
                     print(f"Unknown command: {cmd[0]}")
@@ -381,8 +1021,68 @@ def mode_interactive(args):
             except Exception as e:
                 print(f"Error: {e}")
         
+    finally:
+        if fleet is not None:
+            fleet.stop()
+        broker.disconnect()
+    
+    return True
+
+
+def device_list(args):
+    """Device ids from --device (comma separated) or --doors N"""
+    if args.device:
+        return [device.strip() for device in args.device.split(",") if device.strip()]
+    return [f"door_{i:03d}" for i in range(1, args.doors + 1)]
+
+
+def mode_call(args):
+    """Send an RPC command to one or more devices concurrently"""
+    broker = MQTTRenderBroker(args.host, args.port, args.username, args.password)
+    
+    if not broker.connect():
+        return False
+    
+    try:
+        devices = device_list(args)
+        print(f"\n=== Sending '{args.command}' to {len(devices)} device(s) ===\n")
+        start = time.perf_counter()
+        replies = broker.call_many(devices, args.command, timeout=args.timeout)
+        elapsed = time.perf_counter() - start
+        
+        for device, reply in replies.items():
+            if reply is None:
+                print(f"✗ {device}: timeout")
+            elif reply.get("ok"):
+                print(f"✓ {device}: {reply.get('result')}")
+            else:
+                print(f"✗ {device}: {reply.get('error')}")
+        
+        print(f"\nCompleted in {elapsed * 1000:.1f}ms")
+        broker.rpc_stats.report()
+        return all(reply is not None and reply.get("ok") for reply in replies.values())
     finally:
         broker.disconnect()
+
+
+def mode_responder(args):
+    """Serve roller-door RPC commands"""
+    broker = MQTTRenderBroker(args.host, args.port, args.username, args.password)
+    
+    if not broker.connect():
+        return False
+    
+    responder = RPCResponder(broker, device_list(args), RollerDoorSimulator())
+    try:
+        responder.start()
+        print("\n=== Waiting for commands (Ctrl+C to exit) ===\n")
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+    finally:
+        print(f"\nCommands served: {responder.served}")
+        broker.disconnect()
     
     return True
 
@@ -404,12 +1104,19 @@ Examples:
   
   # Interactive mode
   python3 mqtt_render_pubsub.py --mode interactive --host mqtt-xxxxx.render.com --port 12345
+  
+  # Simulate sensors through the fastest of two brokers
+  python3 mqtt_render_pubsub.py --mode sensor --host mqtt-xxxxx.render.com --port 12345 --brokers mqtt.example.eu:1883
+  
+  # Serve door commands / open 200 doors concurrently
+  python3 mqtt_render_pubsub.py --mode responder --host mqtt-xxxxx.render.com --port 12345 --doors 200
+  python3 mqtt_render_pubsub.py --mode call --host mqtt-xxxxx.render.com --port 12345 --doors 200 --command open
 
 NOTE: Requires Render TCP Service (not Web Service)
         """
     )
     
-    parser.add_argument('--mode', choices=['publish', 'subscribe', 'sensor', 'interactive'],
+    parser.add_argument('--mode', choices=['publish', 'subscribe', 'sensor', 'interactive', 'call', 'responder'],
                         default='interactive',
                         help='Operating mode (default: interactive)')
     parser.add_argument('--host', required=True,
@@ -438,6 +1145,30 @@ NOTE: Requires Render TCP Service (not Web Service)
                         help='Interval in seconds (default: 2)')
     parser.add_argument('--duration', type=int,
                         help='Duration in seconds (0 for infinite)')
+    parser.add_argument('--deadband',
+                        help='Only publish when a field moves this much, e.g. temperature=0.5,humidity=2')
+    parser.add_argument('--deadband-pct', type=float,
+                        help='Percentage-change deadband for fields without an absolute one')
+    parser.add_argument('--heartbeat', type=float, default=60.0,
+                        help='Publish at least once per sensor this often with a deadband (default: 60)')
+    parser.add_argument('--template', action='store_true',
+                        help='Build sensor payloads from precompiled per-sensor templates (sensor mode)')
+    
+    # Multi-broker arguments (publish/sensor modes)
+    parser.add_argument('--brokers',
+                        help='Additional brokers host:port,host:port used together with --host/--port')
+    parser.add_argument('--fanout', choices=['fastest', 'mirror'], default='fastest',
+                        help='Send to the lowest-latency healthy broker or mirror to all (default: fastest)')
+    
+    # RPC mode arguments
+    parser.add_argument('--device',
+                        help='Comma-separated device ids (call/responder modes)')
+    parser.add_argument('--doors', type=int, default=1,
+                        help='Number of doors door_001..door_N when --device is not given (default: 1)')
+    parser.add_argument('--command', default='status',
+                        help='RPC command: open, close, stop, status (default: status)')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='RPC reply timeout in seconds (default: 5)')
     
     args = parser.parse_args()
     
@@ -448,6 +1179,10 @@ NOTE: Requires Render TCP Service (not Web Service)
         success = mode_subscribe(args)
     elif args.mode == 'sensor':
         success = mode_sensor(args)
+    elif args.mode == 'call':
+        success = mode_call(args)
+    elif args.mode == 'responder':
+        success = mode_responder(args)
     else:  # interactive
         success = mode_interactive(args)
     
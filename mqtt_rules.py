@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+MQTT Rules Engine
+Evaluates declarative alert rules over incoming readings and publishes alerts.
+
+Rules file (one rule per line, lines starting with # are comments):
+
+    [name:] [topic filter] <field> <op> <value> [for <duration>]
+    [name:] [topic filter] <field> <state> > <duration>
+
+    high_temp: sensors/+/data temperature > 30 for 60s
+    low_battery: battery < 20
+    door_open: doors/+/state door open > 5m
+
+Operators: > >= < <= == !=. Durations: 500ms, 60s, 5m, 1h or plain seconds.
+The topic filter defaults to #. Non-object payloads are available as field
+"value". Alerts are published to <alerts topic>/<rule name> when a rule starts
+firing and again when it clears.
+
+Rules are compiled once into per-topic-filter, per-field indexes: numeric
+comparisons are kept as sorted thresholds, so a message only costs a binary
+search per (filter, field, operator) group plus the rules whose outcome
+actually changed.
+
+Usage:
+    python3 mqtt_subscriber.py --topic "#" --quiet --rules rules.txt --alerts-topic alerts
+    python3 mqtt_rules.py --rules rules.txt            # check and list compiled rules
+    python3 mqtt_rules.py --bench                      # per-message cost vs rule count
+"""
+
+import re
+import json
+import time
+import heapq
+import random
+import bisect
+import argparse
+import operator
+import threading
+from datetime import datetime
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt,
+             "<=": operator.le, "==": operator.eq, "!=": operator.ne}
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)(ms|s|m|h)?$")
+
+
+def parse_duration(text):
+    """Parse 500ms / 60s / 5m / 1h / 30 into seconds"""
+    match = DURATION_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid duration '{text}'")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2) or "s"]
+
+
+def parse_value(text):
+    """Parse a rule value: number if possible, otherwise a string"""
+    try:
+        return float(text)
+    except ValueError:
+        return text.strip("\"'")
+
+
+class Rule:
+    """One parsed rule"""
+
+    __slots__ = ("index", "name", "topic_filter", "field", "op", "value", "duration", "text")
+
+    def __init__(self, index, name, topic_filter, field, op, value, duration, text):
+        self.index = index
+        self.name = name
+        self.topic_filter = topic_filter
+        self.field = field
+        self.op = op
+        self.value = value
+        self.duration = duration
+        self.text = text
+
+
+def parse_rule(line, index):
+    """
+    Parse one rule line
+
+    Args:
+        line: Rule text (without comment)
+        index: Rule number, used for the default name
+    """
+    tokens = line.split()
+    name = f"rule_{index}"
+    if tokens and tokens[0].endswith(":"):
+        name = tokens.pop(0)[:-1]
+    topic_filter = "#"
+    if tokens and ("/" in tokens[0] or tokens[0] in ("#", "+")):
+        topic_filter = tokens.pop(0)
+
+    duration = 0.0
+    if len(tokens) == 4 and tokens[1] not in OPERATORS and tokens[2] == ">":
+        # Shorthand: "door open > 5m" means door == open for 5m
+        field, value, _, duration_text = tokens
+        op = "=="
+        duration = parse_duration(duration_text)
+    elif len(tokens) in (3, 5):
+        field, op, value = tokens[:3]
+        if len(tokens) == 5:
+            if tokens[3] != "for":
+                raise ValueError(f"Expected 'for <duration>' in '{line}'")
+            duration = parse_duration(tokens[4])
+    else:
+        raise ValueError(f"Cannot parse rule '{line}'")
+
+    if op not in OPERATORS:
+        raise ValueError(f"Unknown operator '{op}' in '{line}'")
+    value = parse_value(value)
+    if op in (">", ">=", "<", "<=") and not isinstance(value, float):
+        raise ValueError(f"Operator '{op}' needs a numeric value in '{line}'")
+    return Rule(index, name, topic_filter, field, op, value, duration, line.strip())
+
+
+def load_rules(path):
+    """Parse a rules file into a list of Rule objects"""
+    rules = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            # Only whole-line comments: "#" is also the multi-level wildcard
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                rules.append(parse_rule(line, len(rules) + 1))
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: {e}")
+    return rules
+
+
+class ThresholdGroup:
+    """
+    All rules on one (filter, field) with the same ordering operator
+
+    Rules are sorted by threshold so the set of true rules is a prefix
+    (for > and >=) or a suffix (for < and <=) found by one bisect. Comparing
+    the split point with the previous message on the same topic yields
+    exactly the rules that changed state.
+    """
+
+    def __init__(self, op, rules):
+        self.op = op
+        rules = sorted(rules, key=lambda rule: rule.value)
+        self.rules = rules
+        self.thresholds = [rule.value for rule in rules]
+        self.greater = op in (">", ">=")
+        # > : thresholds strictly below v are true;  >= : thresholds <= v
+        # < : thresholds strictly above v are true;  <= : thresholds >= v
+        self.split = bisect.bisect_left if op in (">", "<=") else bisect.bisect_right
+
+    def transitions(self, previous, value):
+        """
+        Return (split, became_true, became_false) for a new value
+
+        Args:
+            previous: Split point from the previous message (None if first)
+            value: New numeric value
+        """
+        split = self.split(self.thresholds, value)
+        if previous is None:
+            previous = 0 if self.greater else len(self.rules)
+        if split == previous:
+            return split, (), ()
+        low, high = min(split, previous), max(split, previous)
+        changed = self.rules[low:high]
+        # For > / >= the true set grows when the split moves right; for < / <= when it moves left
+        if (split > previous) == self.greater:
+            return split, changed, ()
+        return split, (), changed
+
+
+class EqualityGroup:
+    """All == rules on one (filter, field), indexed by value"""
+
+    def __init__(self, rules):
+        self.by_value = {}
+        for rule in rules:
+            self.by_value.setdefault(rule.value, []).append(rule)
+
+    def transitions(self, previous, value):
+        if value == previous:
+            return value, (), ()
+        return value, self.by_value.get(value, ()), self.by_value.get(previous, ())
+
+
+class PredicateGroup:
+    """Remaining rules (!=) evaluated one by one"""
+
+    def __init__(self, rules):
+        self.rules = [(rule, OPERATORS[rule.op], rule.value) for rule in rules]
+
+    def transitions(self, previous, value):
+        state = frozenset(rule.index for rule, test, target in self.rules if test(value, target))
+        previous = previous or frozenset()
+        became_true = [rule for rule, _, _ in self.rules if rule.index in state and rule.index not in previous]
+        became_false = [rule for rule, _, _ in self.rules if rule.index in previous and rule.index not in state]
+        return state, became_true, became_false
+
+
+class TopicIndex:
+    """Trie of topic filters for matching a topic against many filters at once"""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, topic_filter, item):
+        node = self.root
+        for level in topic_filter.split("/"):
+            node = node.setdefault(level, {})
+        node.setdefault(None, []).append(item)
+
+    def match(self, topic):
+        """Return every item whose filter matches the topic"""
+        levels = topic.split("/")
+        found = []
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if "#" in node:
+                found.extend(node["#"].get(None, ()))
+            if depth == len(levels):
+                found.extend(node.get(None, ()))
+                continue
+            for key in (levels[depth], "+"):
+                child = node.get(key)
+                if child is not None:
+                    stack.append((child, depth + 1))
+        return found
+
+
+class RuleEngine:
+    """Evaluates compiled rules per message and publishes alert transitions"""
+
+    TOPIC_CACHE_LIMIT = 100000
+
+    def __init__(self, rules, publish=None, alerts_topic="alerts"):
+        """
+        Initialize rule engine
+
+        Args:
+            rules: List of Rule objects
+            publish: Callable(topic, payload) used to publish alerts (prints if None)
+            alerts_topic: Base topic for alerts
+        """
+        self.rules = rules
+        self.publish = publish
+        self.alerts_topic = alerts_topic
+        self.index = TopicIndex()
+        self.topic_cache = {}
+        self.state = {}      # (group id, topic) -> previous split/value
+        self.pending = {}    # (rule index, topic) -> (since, value)
+        self.deadlines = []  # heap of (deadline, rule index, topic, since)
+        self.active = set()  # (rule index, topic) currently firing
+        self.by_index = {rule.index: rule for rule in rules}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.messages = 0
+        self.alerts = 0
+        self.elapsed_ns = 0
+        self._compile()
+
+    def _compile(self):
+        """Group rules by filter and field into indexed evaluation groups"""
+        grouped = {}
+        for rule in self.rules:
+            grouped.setdefault((rule.topic_filter, rule.field), []).append(rule)
+        for (topic_filter, field), rules in grouped.items():
+            groups = []
+            for op in (">", ">=", "<", "<="):
+                selected = [rule for rule in rules if rule.op == op]
+                if selected:
+                    groups.append(ThresholdGroup(op, selected))
+            equal = [rule for rule in rules if rule.op == "=="]
+            if equal:
+                groups.append(EqualityGroup(equal))
+            other = [rule for rule in rules if rule.op == "!="]
+            if other:
+                groups.append(PredicateGroup(other))
+            self.index.add(topic_filter, (field, tuple(groups)))
+
+    def _match(self, topic):
+        entries = self.topic_cache.get(topic)
+        if entries is None:
+            if len(self.topic_cache) >= self.TOPIC_CACHE_LIMIT:
+                self.topic_cache.clear()
+            entries = self.topic_cache[topic] = tuple(self.index.match(topic))
+        return entries
+
+    def evaluate(self, topic, data, now=None):
+        """
+        Evaluate one message
+
+        Args:
+            topic: Message topic
+            data: Decoded JSON object or sensor record, scalar, text, or raw payload bytes
+            now: Current time (defaults to time.monotonic())
+        """
+        if topic.startswith(self.alerts_topic + "/"):
+            return
+        start = time.perf_counter_ns()
+        entries = self._match(topic)
+        if entries:
+            if isinstance(data, (bytes, bytearray)):
+                try:
+                    data = data.decode("utf-8")
+                except UnicodeDecodeError:
+                    return
+            if not isinstance(data, dict) and not hasattr(data, "get"):
+                data = {"value": parse_value(data) if isinstance(data, str) else data}
+            if now is None:
+                now = time.monotonic()
+            with self.lock:
+                for field, groups in entries:
+                    value = data.get(field)
+                    if value is None or isinstance(value, (dict, list)):
+                        continue
+                    numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+                    for group in groups:
+                        if isinstance(group, ThresholdGroup) and not numeric:
+                            continue
+                        key = (id(group), topic)
+                        self.state[key], became_true, became_false = group.transitions(self.state.get(key), value)
+                        for rule in became_true:
+                            self._became_true(rule, topic, value, now)
+                        for rule in became_false:
+                            self._became_false(rule, topic, value)
+                self._expire(now)
+        self.messages += 1
+        self.elapsed_ns += time.perf_counter_ns() - start
+
+    def _became_true(self, rule, topic, value, now):
+        if rule.duration <= 0:
+            self._fire(rule, topic, value)
+            return
+        since = now
+        self.pending[(rule.index, topic)] = (since, value)
+        heapq.heappush(self.deadlines, (since + rule.duration, rule.index, topic, since))
+
+    def _became_false(self, rule, topic, value):
+        key = (rule.index, topic)
+        self.pending.pop(key, None)
+        if key in self.active:
+            self.active.discard(key)
+            self._alert(rule, topic, value, "cleared")
+
+    def _expire(self, now):
+        """Fire 'for' rules whose condition held for the full duration"""
+        deadlines = self.deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, index, topic, since = heapq.heappop(deadlines)
+            pending = self.pending.get((index, topic))
+            if pending is not None and pending[0] == since:
+                del self.pending[(index, topic)]
+                self._fire(self.by_index[index], topic, pending[1])
+
+    def _fire(self, rule, topic, value):
+        self.active.add((rule.index, topic))
+        self._alert(rule, topic, value, "firing")
+
+    def _alert(self, rule, topic, value, state):
+        self.alerts += 1
+        alert = {"rule": rule.name, "state": state, "topic": topic, "value": value,
+                 "condition": rule.text, "timestamp": datetime.now().isoformat()}
+        if self.publish is None:
+            print(f"[ALERT] {rule.name} {state}: {topic} ({rule.text}, value={value})")
+        else:
+            self.publish(f"{self.alerts_topic}/{rule.name}", json.dumps(alert))
+
+    def _tick_loop(self, interval):
+        while not self.stop_event.wait(interval):
+            with self.lock:
+                self._expire(time.monotonic())
+
+    def start(self, interval=1.0):
+        """Start the timer that fires duration rules while topics are silent"""
+        self.thread = threading.Thread(target=self._tick_loop, args=(interval,), name="rules-timer", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def report(self):
+        """Return a one-line summary of evaluation cost"""
+        per_message = self.elapsed_ns / self.messages if self.messages else 0
+        return (f"Rules: {len(self.rules)} rules, {self.messages} messages evaluated, "
+                f"{self.alerts} alerts, {per_message:.0f} ns/msg")
+
+
+def benchmark(counts=(1, 10, 100, 1000, 10000), messages=20000):
+    """Measure per-message evaluation cost as the rule count grows"""
+    fields = ("temperature", "humidity", "pressure", "battery")
+    topics = [f"sensors/sensor_{i:03d}/data" for i in range(100)]
+    # Each sensor drifts slightly around its own base, like the simulator
+    payloads = []
+    for _ in topics:
+        base = {"temperature": random.uniform(15, 35), "humidity": random.uniform(30, 70),
+                "pressure": random.uniform(1000, 1030), "battery": random.uniform(0, 100)}
+        payloads.append([{field: value + random.uniform(-0.05, 0.05) for field, value in base.items()}
+                         for _ in range(10)])
+    for count in counts:
+        rules = [parse_rule(f"r{i}: sensors/+/data {random.choice(fields)} "
+                            f"{random.choice(['>', '<'])} {random.uniform(0, 100):.1f}", i)
+                 for i in range(count)]
+        engine = RuleEngine(rules, publish=lambda topic, payload: None)
+        # The first message per topic fires every rule that already holds; keep that out of the timing
+        for topic in range(len(topics)):
+            engine.evaluate(topics[topic], payloads[topic][0], now=0)
+        engine.alerts = 0
+        start = time.perf_counter()
+        for i in range(messages):
+            topic = i % len(topics)
+            engine.evaluate(topics[topic], payloads[topic][i // len(topics) % 10], now=i)
+        elapsed = time.perf_counter() - start
+        print(f"{count:>6} rules: {elapsed / messages * 1e6:7.2f} us/msg, {engine.alerts} alerts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MQTT Rules Engine')
+    parser.add_argument('--rules', help='Rules file to check')
+    parser.add_argument('--bench', action='store_true', help='Benchmark evaluation cost vs rule count')
+
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark()
+    elif args.rules:
+        rules = load_rules(args.rules)
+        for rule in rules:
+            duration = f" for {rule.duration:g}s" if rule.duration else ""
+            print(f"{rule.name}: [{rule.topic_filter}] {rule.field} {rule.op} {rule.value!r}{duration}")
+        print(f"\n✓ {len(rules)} rules compiled")
+    else:
+        parser.error("specify --rules or --bench")
+
+
+if __name__ == '__main__':
+    main()
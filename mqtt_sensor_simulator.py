@@ -8,10 +8,10 @@ Useful for testing and development
 import paho.mqtt.client as mqtt
 import json
 import time
-import random
 import argparse
 from datetime import datetime
-import math
+
+from mqtt_payload_template import sensor_values
 
 # Handle different versions of paho-mqtt
 try:
@@ -41,6 +41,8 @@ class SensorSimulator:
         self.client = None
         self.connected = False
         self.sequence = 0
+        self.deadband = None
+        self.template = None
         
     def on_connect(self, client, userdata, flags, rc):
         """Callback when client connects"""
@@ -97,13 +99,11 @@ class SensorSimulator:
         """
         self.sequence += 1
         
-        # Simulate realistic sensor readings with slight variation
-        base_temp = 22.0
-        base_humidity = 50.0
+        if self.template is not None:
+            return self._publish_templated(sensor_id)
         
-        temperature = base_temp + random.uniform(-2, 2) + 0.1 * math.sin(self.sequence / 10)
-        humidity = base_humidity + random.uniform(-5, 5) + 0.1 * math.cos(self.sequence / 15)
-        pressure = 1013.25 + random.uniform(-2, 2)
+        # Simulate realistic sensor readings with slight variation
+        temperature, humidity, pressure, battery = sensor_values(self.sequence)
         
         sensor_data = {
             "sensor_id": sensor_id,
@@ -112,9 +112,13 @@ class SensorSimulator:
             "temperature": round(temperature, 2),
             "humidity": round(humidity, 2),
             "pressure": round(pressure, 2),
-            "battery": round(random.uniform(60, 100), 1)
+            "battery": round(battery, 1)
         }
         
+        # Report by exception: skip readings inside the deadband
+        if self.deadband is not None and not self.deadband.should_send(sensor_id, sensor_data):
+            return True
+        
         topic = f"{topic_base}/{sensor_id}/data"
         message = json.dumps(sensor_data)
         
@@ -133,6 +137,34 @@ class SensorSimulator:
             print(f"✗ Publish error: {e}")
             return False
     
+    def _publish_templated(self, sensor_id):
+        """
+        Publish a reading rendered from the precompiled payload template
+        
+        Quiet per message (printing would cost more than building the
+        payload); main() prints one line per round instead.
+        """
+        temperature, humidity, pressure, battery = sensor_values(self.sequence)
+        
+        if self.deadband is not None and not self.deadband.should_send(
+                sensor_id, {"temperature": temperature, "humidity": humidity,
+                            "pressure": pressure, "battery": battery}):
+            return True
+        
+        slot = self.template.slot(sensor_id)
+        message = self.template.render(slot, self.sequence, temperature, humidity, pressure, battery)
+        
+        try:
+            result = self.client.publish(self.template.topics[slot], message, qos=1)
+            if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                return True
+            else:
+                print(f"✗ Publish failed: {result.rc}")
+                return False
+        except Exception as e:
+            print(f"✗ Publish error: {e}")
+            return False
+    
     def disconnect(self):
         """Disconnect from broker"""
         if self.client:
@@ -150,12 +182,25 @@ def main():
     parser.add_argument('--interval', type=int, default=2, help='Interval in seconds between messages (default: 2)')
     parser.add_argument('--duration', type=int, help='Duration in seconds (0 for infinite)')
     parser.add_argument('--topic-base', default='sensors', help='Base topic for sensors (default: sensors)')
+    parser.add_argument('--deadband', help='Only publish when a field moves this much, e.g. temperature=0.5,humidity=2')
+    parser.add_argument('--deadband-pct', type=float, help='Percentage-change deadband for fields without an absolute one')
+    parser.add_argument('--heartbeat', type=float, default=60.0, help='Publish at least once per sensor this often with a deadband (default: 60)')
+    parser.add_argument('--template', action='store_true', help='Build payloads from precompiled per-sensor templates')
     
     args = parser.parse_args()
     
     # Create simulator
     simulator = SensorSimulator(args.host, args.port, args.username, args.password)
     
+    if args.deadband or args.deadband_pct:
+        from mqtt_deadband import create_filter
+        simulator.deadband = create_filter(args)
+    
+    if args.template:
+        from mqtt_payload_template import SensorPayloadTemplate
+        simulator.template = SensorPayloadTemplate(args.topic_base)
+        print("Using precompiled payload templates (one status line per round)")
+    
     # Connect to broker
     if not simulator.connect():
         print("Failed to connect to broker")
@@ -168,14 +213,18 @@ def main():
     print("Press Ctrl+C to stop\n")
     
     start_time = time.time()
+    sensor_ids = [f"sensor_{i:03d}" for i in range(1, args.sensors + 1)]
     
     try:
         while True:
             # Publish data from all sensors
-            for i in range(1, args.sensors + 1):
-                sensor_id = f"sensor_{i:03d}"
+            for sensor_id in sensor_ids:
                 simulator.publish_sensor_data(sensor_id, args.topic_base)
             
+            if simulator.template is not None:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Published round of {len(sensor_ids)} sensors "
+                      f"(sequence {simulator.sequence})")
+            
             # Check duration
             if args.duration and (time.time() - start_time) >= args.duration:
                 print("\nDuration reached, stopping...")
@@ -187,6 +236,8 @@ def main():
     except KeyboardInterrupt:
         print("\n\nInterrupted by user")
     finally:
+        if simulator.deadband:
+            print(simulator.deadband.report())
         print("\nDisconnecting...")
         simulator.disconnect()
         print("Done!")
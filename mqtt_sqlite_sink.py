@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+MQTT SQLite Sink
+Stores decoded sensor readings in a WAL-mode SQLite time-series table
+and queries them back as raw ranges or downsampled series
+
+Usage:
+    # Record readings (via the subscriber)
+    python3 mqtt_subscriber.py --topic "sensors/#" --sink sqlite:readings.db --quiet
+
+    # Raw range for one sensor
+    python3 mqtt_sqlite_sink.py --db readings.db --sensor sensor_001 --start 2025-01-01T10:00:00
+
+    # 60 second averages of temperature
+    python3 mqtt_sqlite_sink.py --db readings.db --sensor sensor_001 --field temperature --bucket 60
+"""
+
+import math
+import sqlite3
+import threading
+import queue
+import argparse
+import json
+import time
+from datetime import datetime
+
+# Numeric reading fields stored as columns
+FIELDS = ("temperature", "humidity", "pressure", "battery")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    sensor_id   TEXT NOT NULL,
+    ts          REAL NOT NULL,
+    topic       TEXT,
+    sequence    INTEGER,
+    temperature REAL,
+    humidity    REAL,
+    pressure    REAL,
+    battery     REAL
+);
+CREATE INDEX IF NOT EXISTS idx_readings_sensor_ts ON readings (sensor_id, ts);
+"""
+
+# SQLite binds Python ints as signed 64-bit integers
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+INSERT_SQL = (
+    "INSERT INTO readings (sensor_id, ts, topic, sequence, temperature, humidity, pressure, battery) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def open_database(path):
+    """Open (and create if needed) a readings database in WAL mode"""
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def parse_time(value):
+    """Parse an epoch number or ISO 8601 string into epoch seconds"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def to_real(value, default=None):
+    """Return a JSON number as a float, or default if it is not one or does not fit"""
+    if not isinstance(value, (int, float)):
+        return default
+    try:
+        return float(value)
+    except OverflowError:
+        return default
+
+
+def to_text(value):
+    """Return value as a str SQLite can encode (lone surrogates become '?')"""
+    return str(value).encode("utf-8", "replace").decode("utf-8")
+
+
+def reading_to_row(topic, data, received_at):
+    """
+    Convert a decoded JSON reading into a table row
+
+    Args:
+        topic: Topic the reading arrived on
+        data: Decoded JSON object
+        received_at: Receive time (epoch seconds), used when the payload has no timestamp
+    """
+    sensor_id = data.get("sensor_id") or data.get("id") or topic
+    ts = received_at
+    stamp = data.get("timestamp")
+    if isinstance(stamp, str):
+        try:
+            ts = datetime.fromisoformat(stamp).timestamp()
+        except ValueError:
+            pass
+    elif isinstance(stamp, (int, float)):
+        ts = to_real(stamp, received_at)
+    if not math.isfinite(ts):
+        # NaN would be bound as NULL and break ts NOT NULL
+        ts = received_at
+
+    # Values SQLite cannot bind (non-numbers, out-of-range ints) are stored as NULL
+    sequence = data.get("sequence")
+    if not isinstance(sequence, int) or not INT64_MIN <= sequence <= INT64_MAX:
+        sequence = None
+    row = [to_text(sensor_id), ts, to_text(topic), sequence]
+    for field in FIELDS:
+        row.append(to_real(data.get(field)))
+    return row
+
+
+class SQLiteSink:
+    """Batched SQLite writer fed from the MQTT network thread"""
+
+    def __init__(self, path, batch_size=5000, flush_interval=0.5):
+        """
+        Initialize SQLite sink
+
+        Args:
+            path: Database file path
+            batch_size: Maximum rows per executemany() transaction
+            flush_interval: Maximum seconds a row waits before being flushed
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.running = False
+        self.rows_written = 0
+        self.batches = 0
+        self.errors = 0
+
+    def start(self):
+        """Create the schema and start the writer thread"""
+        # Create the schema up front so errors surface before subscribing
+        open_database(self.path).close()
+        self.running = True
+        self.thread = threading.Thread(target=self._writer, name="sqlite-sink", daemon=True)
+        self.thread.start()
+        print(f"✓ SQLite sink writing to {self.path}")
+
+    def write(self, topic, data):
+        """
+        Queue a decoded reading (called on the MQTT network thread)
+
+        Args:
+            topic: Topic the reading arrived on
+            data: Decoded JSON object
+        """
+        self.queue.put((topic, data, time.time()))
+
+    def _writer(self):
+        """Writer thread: drain the queue into executemany() batches"""
+        conn = open_database(self.path)
+        try:
+            while True:
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self.running = False
+                        break
+                    batch.append(reading_to_row(*item))
+                if batch:
+                    self._flush(conn, batch)
+                if not self.running:
+                    break
+        finally:
+            conn.close()
+
+    def _flush(self, conn, batch):
+        """Write one batch in a single transaction, falling back to row by row if it fails"""
+        try:
+            with conn:
+                conn.executemany(INSERT_SQL, batch)
+            self.rows_written += len(batch)
+            self.batches += 1
+            return
+        except (sqlite3.Error, ValueError, OverflowError) as e:
+            print(f"✗ SQLite batch write error: {e}, retrying row by row")
+
+        # Only the rows that fail on their own are dropped
+        written = 0
+        with conn:
+            for row in batch:
+                try:
+                    conn.execute(INSERT_SQL, row)
+                    written += 1
+                except (sqlite3.Error, ValueError, OverflowError) as e:
+                    self.errors += 1
+                    print(f"✗ SQLite write error, dropped reading from {row[2]}: {e}")
+        self.rows_written += written
+        self.batches += 1
+
+    def close(self):
+        """Flush pending rows and stop the writer thread"""
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+            print(f"SQLite sink: {self.rows_written} rows in {self.batches} batches")
+
+
+def query_range(conn, sensor_id, start=None, end=None, limit=None):
+    """
+    Return raw readings for a sensor ordered by time
+
+    Args:
+        conn: Database connection
+        sensor_id: Sensor identifier
+        start: Start time (epoch seconds, inclusive)
+        end: End time (epoch seconds, inclusive)
+        limit: Maximum number of rows
+    """
+    sql = "SELECT ts, sequence, temperature, humidity, pressure, battery FROM readings WHERE sensor_id = ?"
+    params = [sensor_id]
+    if start is not None:
+        sql += " AND ts >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND ts <= ?"
+        params.append(end)
+    sql += " ORDER BY ts"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def query_downsampled(conn, sensor_id, field, bucket, start=None, end=None):
+    """
+    Return (bucket_start, count, avg, min, max) rows for one field
+
+    Args:
+        conn: Database connection
+        sensor_id: Sensor identifier
+        field: One of FIELDS
+        bucket: Bucket width in seconds
+        start: Start time (epoch seconds, inclusive)
+        end: End time (epoch seconds, inclusive)
+    """
+    if field not in FIELDS:
+        raise ValueError(f"Unknown field '{field}' (choose from {', '.join(FIELDS)})")
+    sql = (f"SELECT CAST(ts / ? AS INTEGER) * ? AS bucket, COUNT({field}), "
+           f"AVG({field}), MIN({field}), MAX({field}) FROM readings WHERE sensor_id = ?")
+    params = [bucket, bucket, sensor_id]
+    if start is not None:
+        sql += " AND ts >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND ts <= ?"
+        params.append(end)
+    sql += " GROUP BY bucket ORDER BY bucket"
+    return conn.execute(sql, params).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query readings stored by the SQLite sink')
+    parser.add_argument('--db', required=True, help='SQLite database path')
+    parser.add_argument('--sensor', help='Sensor identifier (omit to list sensors)')
+    parser.add_argument('--start', help='Start time (epoch seconds or ISO 8601)')
+    parser.add_argument('--end', help='End time (epoch seconds or ISO 8601)')
+    parser.add_argument('--field', default='temperature', help='Field to downsample (default: temperature)')
+    parser.add_argument('--bucket', type=float, help='Downsample bucket width in seconds')
+    parser.add_argument('--limit', type=int, help='Maximum raw rows to return')
+    parser.add_argument('--json', action='store_true', help='Print rows as JSON lines')
+
+    args = parser.parse_args()
+
+    conn = open_database(args.db)
+    try:
+        if not args.sensor:
+            for sensor_id, count in conn.execute(
+                    "SELECT sensor_id, COUNT(*) FROM readings GROUP BY sensor_id ORDER BY sensor_id"):
+                print(f"{sensor_id}: {count} readings")
+            return
+
+        start = parse_time(args.start)
+        end = parse_time(args.end)
+
+        if args.bucket:
+            columns = ("bucket", "count", "avg", "min", "max")
+            rows = query_downsampled(conn, args.sensor, args.field, args.bucket, start, end)
+        else:
+            columns = ("ts", "sequence") + FIELDS
+            rows = query_range(conn, args.sensor, start, end, args.limit)
+
+        for row in rows:
+            if args.json:
+                print(json.dumps(dict(zip(columns, row))))
+            else:
+                stamp = datetime.fromtimestamp(row[0]).isoformat()
+                print(stamp, *row[1:])
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
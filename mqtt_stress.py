@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+MQTT Slow-Consumer Stress Test
+Pairs the sensor fleet with a subscriber that processes at a fixed rate and
+sweeps the offered load, to see what the broker does once the subscriber
+falls behind (mosquitto.conf: max_queued_messages 1000).
+
+For each load step it reports:
+    offered   - messages per second the fleet actually published, next to
+                the requested target
+    dropped   - readings never delivered (sequence gaps and lost tail)
+    latency   - publish-to-process latency at the start and end of the step,
+                i.e. how much the broker/socket queue grew
+    recovery  - seconds after the load stops until the backlog is drained
+
+Usage:
+    python3 mqtt_stress.py --host localhost --port 1883 --process-rate 500 --loads 250,500,1000,2000
+    python3 mqtt_stress.py --host localhost --port 1883 --process-rate 200 --duration 20 --json stress.json
+"""
+
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+
+from mqtt_subscriber import MQTTSubscriber
+from mqtt_render_pubsub import MQTTRenderBroker, SensorFleet
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted list (0.0 for an empty list)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class ThrottledSubscriber(MQTTSubscriber):
+    """Subscriber that handles at most process_rate messages per second and tracks sequence gaps"""
+
+    def __init__(self, broker_host, broker_port, username, password, process_rate, client_id="python-stress-subscriber"):
+        """
+        Initialize throttled subscriber
+
+        Args:
+            broker_host: MQTT broker hostname
+            broker_port: MQTT broker port
+            username: MQTT username
+            password: MQTT password
+            process_rate: Messages processed per second (0 = unthrottled)
+            client_id: MQTT client id
+        """
+        super().__init__(broker_host, broker_port, username, password, client_id)
+        self.quiet = True
+        self.process_rate = process_rate
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear per-step counters"""
+        with self.lock:
+            self.next_free = 0.0
+            self.last_sequence = 0
+            self.received = 0
+            self.gaps = 0
+            self.gap_messages = 0
+            self.out_of_order = 0
+            self.last_arrival = None
+            self.samples = []  # (processed at, latency seconds)
+
+    def on_message(self, client, userdata, msg):
+        """Record sequence and latency, then hold the network thread to simulate slow processing"""
+        now = time.time()
+        self.message_count += 1
+        kind, data = self.decoder.decode(msg.topic, msg.payload)
+        sequence = data.get("sequence") if hasattr(data, "get") else None
+
+        with self.lock:
+            self.received += 1
+            self.last_arrival = now
+            if isinstance(sequence, int):
+                if sequence > self.last_sequence + 1 and self.last_sequence:
+                    self.gaps += 1
+                    self.gap_messages += sequence - self.last_sequence - 1
+                if sequence > self.last_sequence:
+                    self.last_sequence = sequence
+                else:
+                    self.out_of_order += 1
+            stamp = data.get("timestamp") if hasattr(data, "get") else None
+            if stamp:
+                try:
+                    self.samples.append((now, now - datetime.fromisoformat(stamp).timestamp()))
+                except ValueError:
+                    pass
+
+        if self.process_rate:
+            # Fixed service time per message; sleeping blocks the socket so the backlog queues upstream
+            self.next_free = max(self.next_free, now) + 1.0 / self.process_rate
+            delay = self.next_free - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+
+def run_step(broker, subscriber, load, args):
+    """
+    Offer one load level and measure delivery, latency and recovery
+
+    Args:
+        broker: Connected MQTTRenderBroker used by the fleet
+        subscriber: Connected ThrottledSubscriber
+        load: Offered messages per second
+        args: Parsed command line arguments
+    """
+    subscriber.reset()
+    fleet = SensorFleet(broker, args.sensors, args.sensors / load, args.topic_base)
+
+    started = time.time()
+    fleet.start()
+    time.sleep(args.duration)
+    fleet.stop()
+    stopped = time.time()
+
+    # Drain: wait until the last sequence arrives or nothing has come in for --idle seconds
+    deadline = stopped + args.drain_timeout
+    while time.time() < deadline:
+        with subscriber.lock:
+            done = subscriber.last_sequence >= fleet.sequence
+            idle = subscriber.last_arrival is None or time.time() - subscriber.last_arrival >= args.idle
+        if done or idle:
+            break
+        time.sleep(0.05)
+
+    with subscriber.lock:
+        samples = list(subscriber.samples)
+        last_arrival = subscriber.last_arrival or stopped
+        received = subscriber.received
+        step = {
+            # What the fleet actually sent; it can fall short of the target
+            "target_rate": load,
+            "offered_rate": fleet.published / (stopped - started),
+            "published": fleet.published,
+            "publish_failed": fleet.failed,
+            "received": received,
+            "dropped": max(0, fleet.published - received),
+            "gaps": subscriber.gaps,
+            "gap_messages": subscriber.gap_messages,
+            "out_of_order": subscriber.out_of_order,
+        }
+
+    # Latency of messages processed in the first and last second of the load phase
+    head = [latency for at, latency in samples if at < started + 1.0]
+    tail = [latency for at, latency in samples if stopped - 1.0 <= at < stopped]
+    step.update({
+        "drop_ratio": step["dropped"] / step["published"] if step["published"] else 0.0,
+        "processed_rate": received / (last_arrival - started) if last_arrival > started else 0.0,
+        "latency_start_p50": percentile(head, 0.5),
+        "latency_end_p50": percentile(tail, 0.5),
+        "latency_p99": percentile([latency for _, latency in samples], 0.99),
+        "recovery_time": max(0.0, last_arrival - stopped),
+    })
+    return step
+
+
+def print_step(step):
+    print(f"{step['target_rate']:>8.0f} {step['offered_rate']:>8.0f} {step['published']:>9} {step['received']:>9} "
+          f"{step['dropped']:>8} {step['drop_ratio']:>6.1%} {step['gaps']:>6} "
+          f"{step['latency_start_p50'] * 1000:>9.0f} {step['latency_end_p50'] * 1000:>9.0f} "
+          f"{step['latency_p99'] * 1000:>9.0f} {step['recovery_time']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MQTT slow-consumer stress test')
+    parser.add_argument('--host', default='localhost', help='MQTT broker host (default: localhost)')
+    parser.add_argument('--port', type=int, default=1883, help='MQTT broker port (default: 1883)')
+    parser.add_argument('--username', default='admin', help='MQTT username (default: admin)')
+    parser.add_argument('--password', default='password', help='MQTT password (default: password)')
+    parser.add_argument('--loads', default='100,250,500,1000,2000',
+                        help='Offered loads to sweep in msg/s (default: 100,250,500,1000,2000)')
+    parser.add_argument('--process-rate', type=float, default=500.0,
+                        help='Subscriber processing rate in msg/s, 0 = unthrottled (default: 500)')
+    parser.add_argument('--sensors', type=int, default=100, help='Number of sensors (default: 100)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per step (default: 10)')
+    parser.add_argument('--qos', type=int, default=1, help='Subscriber QoS (default: 1)')
+    parser.add_argument('--topic-base', default='stress', help='Base topic for the fleet (default: stress)')
+    parser.add_argument('--idle', type=float, default=3.0,
+                        help='Seconds without messages that ends a drain (default: 3)')
+    parser.add_argument('--drain-timeout', type=float, default=120.0,
+                        help='Maximum seconds to wait for the backlog after each step (default: 120)')
+    parser.add_argument('--json', help='Write step results to this JSON file')
+
+    args = parser.parse_args()
+    loads = [float(load) for load in args.loads.split(',')]
+
+    subscriber = ThrottledSubscriber(args.host, args.port, args.username, args.password, args.process_rate)
+    broker = MQTTRenderBroker(args.host, args.port, args.username, args.password)
+    if not subscriber.connect() or not subscriber.subscribe(f"{args.topic_base}/#", qos=args.qos):
+        subscriber.disconnect()
+        return
+    if not broker.connect():
+        subscriber.disconnect()
+        return
+
+    print(f"\nSubscriber processes {args.process_rate:.0f} msg/s; {args.duration:.0f}s per step\n")
+    print(f"{'target':>8} {'offered':>8} {'published':>9} {'received':>9} {'dropped':>8} {'drop%':>6} {'gaps':>6} "
+          f"{'lat0 ms':>9} {'lat1 ms':>9} {'p99 ms':>9} {'recover s':>9}")
+
+    steps = []
+    try:
+        for load in loads:
+            step = run_step(broker, subscriber, load, args)
+            steps.append(step)
+            print_step(step)
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+    finally:
+        broker.disconnect()
+        subscriber.disconnect()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"process_rate": args.process_rate, "duration": args.duration,
+                       "sensors": args.sensors, "qos": args.qos, "steps": steps}, f, indent=2)
+        print(f"\n✓ Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
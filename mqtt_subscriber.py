@@ -9,6 +9,11 @@ import json
 import argparse
 from datetime import datetime
 import time
+import os
+import zlib
+import multiprocessing
+
+from mqtt_decoder import PayloadDecoder, is_record, plain, KIND_SENSOR, KIND_JSON, KIND_TEXT
 
 # Handle different versions of paho-mqtt
 try:
@@ -18,6 +23,30 @@ except ImportError:
     MQTT_CALLBACK_API = None
 
 
+def create_sink(spec, worker=None):
+    """
+    Create a reading sink from a --sink specification
+
+    Args:
+        spec: "<kind>:<path>", e.g. "sqlite:readings.db", "columnar:export_dir"
+              (kinds: sqlite, columnar, npy, parquet)
+        worker: Worker index in a worker group (columnar exports get a subdirectory each;
+                SQLite databases are shared through WAL mode)
+    """
+    kind, _, path = spec.partition(':')
+    if not path:
+        raise ValueError(f"Invalid sink '{spec}' (expected <kind>:<path>)")
+    if kind == 'sqlite':
+        from mqtt_sqlite_sink import SQLiteSink
+        return SQLiteSink(path)
+    if kind in ('columnar', 'npy', 'parquet'):
+        from mqtt_columnar_export import ColumnarExporter
+        if worker is not None:
+            path = os.path.join(path, f"worker-{worker}")
+        return ColumnarExporter(path, fmt='auto' if kind == 'columnar' else kind)
+    raise ValueError(f"Unknown sink type '{kind}'")
+
+
 class MQTTSubscriber:
     def __init__(self, broker_host, broker_port, username, password, client_id="python-subscriber"):
         """
@@ -38,6 +67,16 @@ class MQTTSubscriber:
         self.client = None
         self.connected = False
         self.message_count = 0
+        self.quiet = False
+        self.decoder = PayloadDecoder()
+        self.sink = None
+        self.dedup = None
+        self.cache = None
+        self.rules = None
+        self.sampler = None
+        self.topic_stats = None
+        self.partition = None
+        self.skipped = 0
         
     def on_connect(self, client, userdata, flags, rc):
         """Callback when client connects"""
@@ -62,7 +101,40 @@ class MQTTSubscriber:
     
     def on_message(self, client, userdata, msg):
         """Callback when message is received"""
+        if self.partition is not None:
+            # Hash partitioning: only handle topics owned by this worker
+            index, workers = self.partition
+            if zlib.crc32(msg.topic.encode('utf-8')) % workers != index:
+                self.skipped += 1
+                return
+        
         self.message_count += 1
+        
+        if self.topic_stats is not None:
+            self.topic_stats.add(msg.topic, len(msg.payload))
+        
+        if self.cache is not None:
+            self.cache.update(msg.topic, msg.payload)
+        
+        # Payload kind is learned per topic, so this is a single decode attempt
+        kind, data = self.decoder.decode(msg.topic, msg.payload)
+        record = is_record(kind, data)
+        
+        if self.dedup is not None and record and not self.dedup.check(msg.topic, data):
+            return
+        
+        if self.rules is not None:
+            self.rules.evaluate(msg.topic, data)
+        
+        if self.sink is not None and record:
+            self.sink.write(msg.topic, data)
+        
+        if self.quiet:
+            return
+        
+        if self.sampler is not None and not self.sampler.should_print(msg.topic):
+            return
+        
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         print(f"\n[{timestamp}] Message #{self.message_count}")
@@ -70,17 +142,16 @@ class MQTTSubscriber:
         print(f"QoS: {msg.qos}")
         print(f"Payload ({len(msg.payload)} bytes):")
         
-        # Try to decode as JSON
-        try:
-            payload = msg.payload.decode('utf-8')
-            data = json.loads(payload)
+        if kind is KIND_SENSOR:
+            print(json.dumps(plain(data), indent=2))
+        elif kind is KIND_JSON:
             print(json.dumps(data, indent=2))
-        except (json.JSONDecodeError, UnicodeDecodeError):
-            # Just print as string
-            try:
-                print(msg.payload.decode('utf-8'))
-            except UnicodeDecodeError:
-                print(f"[Binary data: {msg.payload.hex()}]")
+        elif kind is KIND_TEXT:
+            print(data)
+        else:
+            # Preview only: hex() of a multi-megabyte blob doubles it in memory
+            preview = msg.payload[:32].hex()
+            print(f"[Binary data: {preview}{'...' if len(msg.payload) > 32 else ''}]")
         
         print("-" * 50)
     
@@ -146,6 +217,14 @@ class MQTTSubscriber:
         if self.client:
             self.client.loop_stop()
             self.client.disconnect()
+        if self.topic_stats:
+            self.topic_stats.close()
+        if self.rules:
+            self.rules.close()
+        if self.sink:
+            self.sink.close()
+        if self.cache:
+            self.cache.close()
     
     def keep_listening(self):
         """Keep the client listening (blocking)"""
@@ -157,24 +236,80 @@ class MQTTSubscriber:
             pass
 
 
-def main():
-    parser = argparse.ArgumentParser(description='MQTT Subscriber Script')
-    parser.add_argument('--host', default='localhost', help='MQTT broker host (default: localhost)')
-    parser.add_argument('--port', type=int, default=1883, help='MQTT broker port (default: 1883)')
-    parser.add_argument('--username', default='admin', help='MQTT username (default: admin)')
-    parser.add_argument('--password', default='password', help='MQTT password (default: password)')
-    parser.add_argument('--topic', default='test/topic', help='MQTT topic to subscribe to (supports # and + wildcards)')
-    parser.add_argument('--qos', type=int, default=1, help='Quality of Service (0, 1, or 2)')
-    parser.add_argument('--all', action='store_true', help='Subscribe to all topics (#)')
+def build_subscriber(args, client_id="python-subscriber", worker=None):
+    """
+    Create a subscriber with the processing stages selected on the command line
     
-    args = parser.parse_args()
+    Args:
+        args: Parsed command line arguments
+        client_id: MQTT client id
+        worker: Worker index when running in a worker group
+    
+    Returns:
+        MQTTSubscriber, or None if a stage could not be started
+    """
+    subscriber = MQTTSubscriber(args.host, args.port, args.username, args.password, client_id)
+    subscriber.quiet = args.quiet
+    suffix = f".{worker}" if worker is not None else ""
+    
+    if args.dedup:
+        from mqtt_dedup import create_dedup
+        subscriber.dedup = create_dedup(args.dedup, args.dedup_window, args.dedup_capacity,
+                                        args.dedup_fp_rate, args.dedup_ttl)
+    
+    if args.cache_snapshot or args.cache_socket:
+        from mqtt_last_value_cache import LastValueCache
+        subscriber.cache = LastValueCache(args.cache_snapshot and args.cache_snapshot + suffix,
+                                          args.snapshot_interval,
+                                          args.cache_socket and args.cache_socket + suffix)
+        subscriber.cache.start()
+    
+    if args.sample or args.max_rate:
+        from mqtt_topic_stats import TopicSampler
+        subscriber.sampler = TopicSampler(args.sample, args.max_rate)
+    
+    if args.top:
+        from mqtt_topic_stats import TopicStats
+        # The in-place view replaces per-message output
+        subscriber.quiet = True
+        subscriber.topic_stats = TopicStats(args.top, args.refresh)
+        subscriber.topic_stats.start()
     
-    # Create subscriber
-    subscriber = MQTTSubscriber(args.host, args.port, args.username, args.password)
+    if args.rules:
+        from mqtt_rules import load_rules, RuleEngine
+        try:
+            rules = load_rules(args.rules)
+        except (OSError, ValueError) as e:
+            print(f"✗ Rules error: {e}")
+            subscriber.disconnect()
+            return None
+        subscriber.rules = RuleEngine(rules, lambda topic, payload: subscriber.client.publish(topic, payload, qos=1),
+                                      args.alerts_topic)
+        subscriber.rules.start()
+        print(f"✓ Loaded {len(rules)} rules from {args.rules}")
+    
+    if args.sink:
+        try:
+            subscriber.sink = create_sink(args.sink, worker)
+            subscriber.sink.start()
+        except Exception as e:
+            print(f"✗ Sink error: {e}")
+            subscriber.disconnect()
+            return None
+    
+    return subscriber
+
+
+def run_subscriber(args):
+    """Run a single subscriber process"""
+    subscriber = build_subscriber(args)
+    if subscriber is None:
+        return
     
     # Connect to broker
     if not subscriber.connect():
         print("Failed to connect to broker")
+        subscriber.disconnect()
         return
     
     # Subscribe to topic
@@ -194,8 +329,155 @@ def main():
         print("\nDisconnecting...")
         subscriber.disconnect()
         print(f"Total messages received: {subscriber.message_count}")
+        print(subscriber.decoder.report())
+        if subscriber.sampler:
+            print(subscriber.sampler.report())
+        if subscriber.dedup:
+            print(subscriber.dedup.report())
+        if subscriber.rules:
+            print(subscriber.rules.report())
         print("Done!")
 
 
+def run_worker(args, index, counters, stop_event):
+    """
+    Worker process body: one subscriber in the group
+    
+    Args:
+        args: Parsed command line arguments
+        index: Worker index
+        counters: Shared array of per-worker message counts
+        stop_event: Set by the parent to stop all workers
+    """
+    subscriber = build_subscriber(args, f"python-subscriber-{args.group}-{index}", worker=index)
+    if subscriber is None or not subscriber.connect():
+        if subscriber:
+            subscriber.disconnect()
+        return
+    
+    topic = '#' if args.all else args.topic
+    if args.no_shared:
+        subscriber.partition = (index, args.workers)
+    else:
+        topic = f"$share/{args.group}/{topic}"
+    
+    if not subscriber.subscribe(topic, qos=args.qos):
+        subscriber.disconnect()
+        return
+    
+    try:
+        while not stop_event.wait(0.5):
+            counters[index] = subscriber.message_count
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.disconnect()
+        counters[index] = subscriber.message_count
+        if subscriber.dedup:
+            print(f"[worker {index}] {subscriber.dedup.report()}")
+        if subscriber.rules:
+            print(f"[worker {index}] {subscriber.rules.report()}")
+
+
+def run_worker_group(args):
+    """Start --workers subscriber processes and report aggregated stats"""
+    mode = "hash-partitioned" if args.no_shared else f"shared subscription $share/{args.group}"
+    print(f"Starting {args.workers} workers ({mode})...")
+    
+    counters = multiprocessing.Array('q', args.workers, lock=False)
+    stop_event = multiprocessing.Event()
+    workers = [multiprocessing.Process(target=run_worker, args=(args, index, counters, stop_event),
+                                       name=f"subscriber-worker-{index}")
+               for index in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    
+    print("\n=== Listening for messages (Ctrl+C to exit) ===\n")
+    
+    last_total = 0
+    last_time = time.time()
+    try:
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(args.stats_interval)
+            now = time.time()
+            counts = list(counters)
+            total = sum(counts)
+            rate = (total - last_total) / (now - last_time)
+            last_total, last_time = total, now
+            per_worker = " ".join(str(count) for count in counts)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {total} messages, {rate:.0f} msg/s "
+                  f"(per worker: {per_worker})")
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+        print(f"\nTotal messages received: {sum(counters)}")
+        print("Done!")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MQTT Subscriber Script')
+    parser.add_argument('--host', default='localhost', help='MQTT broker host (default: localhost)')
+    parser.add_argument('--port', type=int, default=1883, help='MQTT broker port (default: 1883)')
+    parser.add_argument('--username', default='admin', help='MQTT username (default: admin)')
+    parser.add_argument('--password', default='password', help='MQTT password (default: password)')
+    parser.add_argument('--topic', default='test/topic', help='MQTT topic to subscribe to (supports # and + wildcards)')
+    parser.add_argument('--qos', type=int, default=1, help='Quality of Service (0, 1, or 2)')
+    parser.add_argument('--all', action='store_true', help='Subscribe to all topics (#)')
+    parser.add_argument('--quiet', action='store_true', help='Do not print individual messages')
+    parser.add_argument('--sink', help='Store decoded readings, e.g. sqlite:readings.db or columnar:export_dir')
+    parser.add_argument('--dedup', choices=['window', 'bloom'],
+                        help='Drop QoS1 redeliveries keyed on (sensor_id, sequence); '
+                             'with --workers it needs --no-shared')
+    parser.add_argument('--dedup-window', type=int, default=1024,
+                        help='Sequences remembered per source for --dedup window (default: 1024)')
+    parser.add_argument('--dedup-capacity', type=int, default=1000000,
+                        help='Messages per TTL for --dedup bloom (default: 1000000)')
+    parser.add_argument('--dedup-fp-rate', type=float, default=0.001,
+                        help='False-positive rate for --dedup bloom (default: 0.001)')
+    parser.add_argument('--dedup-ttl', type=float, default=300.0,
+                        help='Seconds per generation for --dedup bloom (default: 300)')
+    parser.add_argument('--cache-snapshot', help='Keep a last-value cache, snapshotted to this file')
+    parser.add_argument('--cache-socket', help='Serve last-value cache queries on this Unix socket')
+    parser.add_argument('--snapshot-interval', type=float, default=30.0,
+                        help='Seconds between cache snapshots (default: 30)')
+    parser.add_argument('--sample', type=int,
+                        help='Print only one message in every N per topic')
+    parser.add_argument('--max-rate', type=float,
+                        help='Print at most K messages per second per topic')
+    parser.add_argument('--top', type=int,
+                        help='Show the N busiest topics by rate, refreshed in place, instead of messages')
+    parser.add_argument('--refresh', type=float, default=2.0,
+                        help='Seconds between --top refreshes (default: 2)')
+    parser.add_argument('--rules', help='Evaluate alert rules from this file (see mqtt_rules.py)')
+    parser.add_argument('--alerts-topic', default='alerts',
+                        help='Base topic for published alerts (default: alerts)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of subscriber processes (default: 1)')
+    parser.add_argument('--group', default='subscribers',
+                        help='Shared subscription group for --workers (default: subscribers)')
+    parser.add_argument('--no-shared', action='store_true',
+                        help='Hash-partition topics across workers instead of using $share subscriptions')
+    parser.add_argument('--stats-interval', type=float, default=5.0,
+                        help='Seconds between aggregated worker stats (default: 5)')
+    
+    args = parser.parse_args()
+    
+    if args.top and args.workers > 1:
+        # Each worker only sees its share of the traffic, so per-worker views would mislead
+        parser.error("--top needs a single subscriber process; drop --workers")
+    if args.dedup and args.workers > 1 and not args.no_shared:
+        # The broker may redeliver a $share message to another member, whose dedup state
+        # never saw it; hash partitioning keeps each topic (and its sensor) on one worker
+        parser.error("--dedup with --workers needs --no-shared")
+    
+    if args.workers > 1:
+        run_worker_group(args)
+    else:
+        run_subscriber(args)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+MQTT Topic Statistics
+Bounded-memory per-topic counting for busy brokers, so subscribing to # does
+not flood the terminal:
+
+    CountMinSketch - approximate per-topic counts in a fixed table
+    SpaceSaving    - heavy-hitter topics with a fixed number of counters
+    TopicSampler   - print 1-in-N messages and/or at most K/s per topic
+    TopicStats     - top-N topics by rate, redrawn in place
+
+Usage:
+    python3 mqtt_subscriber.py --all --sample 100
+    python3 mqtt_subscriber.py --all --max-rate 1
+    python3 mqtt_subscriber.py --all --top 20 --refresh 2
+
+    # Check heavy-hitter accuracy and memory on a synthetic skewed workload
+    python3 mqtt_topic_stats.py --topics 1000000 --messages 2000000 --top 10
+"""
+
+import sys
+import time
+import heapq
+import random
+import argparse
+import threading
+from array import array
+from collections import Counter
+
+
+class CountMinSketch:
+    """Approximate counter: never undercounts, memory is width * depth * 8 bytes"""
+
+    def __init__(self, width=32768, depth=4):
+        """
+        Initialize count-min sketch
+
+        Args:
+            width: Counters per row (overcount is about total / width)
+            depth: Rows (probability of exceeding that bound falls as e^-depth)
+        """
+        self.width = width
+        self.depth = depth
+        self.table = array('Q', bytes(8 * width * depth))
+
+    def _indexes(self, key):
+        # Double hashing: row i uses h1 + i * h2
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        """Count a key and return its new estimate"""
+        table = self.table
+        estimate = None
+        for index in self._indexes(key):
+            value = table[index] + count
+            table[index] = value
+            if estimate is None or value < estimate:
+                estimate = value
+        return estimate
+
+    def estimate(self, key):
+        table = self.table
+        return min(table[index] for index in self._indexes(key))
+
+    def clear(self):
+        self.table = array('Q', bytes(8 * self.width * self.depth))
+
+    def memory_bytes(self):
+        return sys.getsizeof(self.table)
+
+
+class SpaceSaving:
+    """
+    Heavy hitters with a fixed number of counters
+
+    A new key replaces the smallest counter and inherits its count as error,
+    so every key counted more than total / capacity times is kept.
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        Initialize space-saving summary
+
+        Args:
+            capacity: Number of keys tracked
+        """
+        self.capacity = capacity
+        self.counts = {}  # key -> [count, error]
+        self.heap = []    # one (count, key) per key; counts may lag behind (lazy)
+
+    def add(self, key, count=1):
+        entry = self.counts.get(key)
+        if entry is not None:
+            entry[0] += count
+            return
+        heap = self.heap
+        if len(self.counts) < self.capacity:
+            self.counts[key] = [count, 0]
+            heapq.heappush(heap, (count, key))
+            return
+
+        # Refresh stale heap entries until the top is the true minimum
+        while True:
+            lagging, victim = heap[0]
+            actual = self.counts[victim][0]
+            if lagging == actual:
+                break
+            heapq.heapreplace(heap, (actual, victim))
+        del self.counts[victim]
+        self.counts[key] = [actual + count, actual]
+        heapq.heapreplace(heap, (actual + count, key))
+
+    def top(self, n):
+        """Return [(key, count, error)] for the n largest counts"""
+        items = heapq.nlargest(n, self.counts.items(), key=lambda item: item[1][0])
+        return [(key, count, error) for key, (count, error) in items]
+
+    def clear(self):
+        self.counts = {}
+        self.heap = []
+
+    def memory_bytes(self):
+        size = sys.getsizeof(self.counts) + sys.getsizeof(self.heap)
+        size += sum(sys.getsizeof(key) + sys.getsizeof(entry) for key, entry in self.counts.items())
+        return size
+
+
+class TopicSampler:
+    """Decides which messages get printed: 1-in-N per topic and/or at most K per second per topic"""
+
+    def __init__(self, every=None, max_rate=None, width=32768, depth=4):
+        """
+        Initialize topic sampler
+
+        Args:
+            every: Print one message in every N per topic (approximate for colliding topics)
+            max_rate: Print at most this many messages per second per topic
+            width: Count-min sketch width
+            depth: Count-min sketch depth
+        """
+        self.every = every
+        self.max_rate = max_rate
+        self.seen = CountMinSketch(width, depth) if every else None
+        self.window = CountMinSketch(width, depth) if max_rate else None
+        self.second = None
+        self.printed = 0
+        self.suppressed = 0
+
+    def should_print(self, topic, now=None):
+        if self.seen is not None and (self.seen.add(topic) - 1) % self.every:
+            self.suppressed += 1
+            return False
+        if self.window is not None:
+            second = int(now if now is not None else time.monotonic())
+            if second != self.second:
+                self.second = second
+                self.window.clear()
+            # Overestimates only ever suppress, so the rate limit holds
+            if self.window.add(topic) > self.max_rate:
+                self.suppressed += 1
+                return False
+        self.printed += 1
+        return True
+
+    def report(self):
+        return f"Sampling: {self.printed} messages printed, {self.suppressed} suppressed"
+
+
+class TopicStats:
+    """Top-N topics by message rate, redrawn in place every refresh interval"""
+
+    def __init__(self, top=10, refresh=2.0, capacity=None, width=32768, depth=4):
+        """
+        Initialize topic statistics view
+
+        Args:
+            top: Number of topics shown
+            refresh: Seconds between redraws (also the rate window)
+            capacity: Heavy-hitter counters (default: 20 * top, at least 100)
+            width: Count-min sketch width for per-topic totals
+            depth: Count-min sketch depth
+        """
+        self.top_n = top
+        self.refresh = refresh
+        self.window = SpaceSaving(capacity or max(100, 20 * top))
+        self.totals = CountMinSketch(width, depth)
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.bytes = 0
+        self.window_messages = 0
+        self.window_bytes = 0
+        self.window_start = time.monotonic()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def add(self, topic, size):
+        """Count one message (called on the MQTT network thread)"""
+        with self.lock:
+            self.window.add(topic)
+            self.totals.add(topic)
+            self.window_messages += 1
+            self.window_bytes += size
+
+    def render(self):
+        """Return the view for the window that just ended and start a new window"""
+        now = time.monotonic()
+        with self.lock:
+            elapsed = max(now - self.window_start, 1e-9)
+            top = self.window.top(self.top_n)
+            totals = [self.totals.estimate(topic) for topic, _, _ in top]
+            window_messages, window_bytes = self.window_messages, self.window_bytes
+            self.messages += window_messages
+            self.bytes += window_bytes
+            self.window.clear()
+            self.window_messages = self.window_bytes = 0
+            self.window_start = now
+
+        lines = [f"[{time.strftime('%H:%M:%S')}] {window_messages / elapsed:.0f} msg/s, "
+                 f"{window_bytes / elapsed / 1024:.1f} KiB/s | {self.messages} messages total",
+                 "",
+                 f"{'#':>3} {'msg/s':>9} {'share':>6} {'total':>10}  topic"]
+        for rank, ((topic, count, error), total) in enumerate(zip(top, totals), 1):
+            share = count / window_messages if window_messages else 0.0
+            approx = "~" if error else " "
+            lines.append(f"{rank:>3} {count / elapsed:>8.1f}{approx} {share:>6.1%} {total:>10}  {topic}")
+        return "\n".join(lines)
+
+    def _display_loop(self):
+        while not self.stop_event.wait(self.refresh):
+            # Clear the screen and draw from the top-left corner
+            sys.stdout.write("\x1b[H\x1b[J" + self.render() + "\n")
+            sys.stdout.flush()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._display_loop, name="topic-stats", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check topic heavy-hitter accuracy on a synthetic workload')
+    parser.add_argument('--topics', type=int, default=1000000, help='Distinct topics (default: 1000000)')
+    parser.add_argument('--messages', type=int, default=2000000, help='Messages to count (default: 2000000)')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of topic popularity (default: 1.1)')
+    parser.add_argument('--top', type=int, default=10, help='Topics to compare (default: 10)')
+    parser.add_argument('--capacity', type=int, default=1000, help='Heavy-hitter counters (default: 1000)')
+
+    args = parser.parse_args()
+
+    # Zipf-like ranks via inverse-CDF sampling of a continuous power law
+    exponent = 1 - args.skew
+    def rank():
+        u = random.random()
+        return int(((args.topics ** exponent - 1) * u + 1) ** (1 / exponent)) - 1
+
+    summary = SpaceSaving(args.capacity)
+    sketch = CountMinSketch()
+    exact = Counter()
+    start = time.perf_counter()
+    for _ in range(args.messages):
+        topic = f"sensors/sensor_{rank():07d}/data"
+        summary.add(topic)
+        sketch.add(topic)
+        exact[topic] += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.messages} messages over {len(exact)} distinct topics in {elapsed:.1f}s\n")
+    print(f"{'exact':>8} {'space-saving':>14} {'count-min':>10}  topic")
+    for topic, count, error in summary.top(args.top):
+        print(f"{exact[topic]:>8} {count:>9} ±{error:<3} {sketch.estimate(topic):>10}  {topic}")
+    found = {topic for topic, _, _ in summary.top(args.top)}
+    hits = sum(1 for topic, _ in exact.most_common(args.top) if topic in found)
+    print(f"\nTrue top-{args.top} recovered: {hits}/{args.top}")
+    print(f"Memory: space-saving {summary.memory_bytes() / 1024:.0f} KiB, "
+          f"count-min {sketch.memory_bytes() / 1024:.0f} KiB "
+          f"(exact dictionary {sys.getsizeof(exact) / 1024:.0f} KiB before keys)")
+
+
+if __name__ == '__main__':
+    main()